@@ -0,0 +1,112 @@
+## Ultimate Tic Tac Toe project - many games held in NumPy arrays and stepped together
+## for self-play, where every game makes one move per step so that the positions of all of them can be evaluated by the net in one batch
+
+## comment terminology : local board/grid refers to a 3x3 normal tic tac toe board, global refers to the 3x3x3x3 ultimate board
+## local board (x,y) is index k = 3*x + y and square (i,j) within it is index c = 3*i + j, so move 27*x + 9*y + 3*i + j is 9*k + c (the order of Board.flatten)
+
+import numpy as np
+
+from Playout import WINNING_ARRAY, OPEN_LINE_ARRAY, game_results, ONGOING, X_WIN, O_WIN, DRAW
+
+## BITS[c] is the bit of square (or local board) c in a 9 bit mask
+BITS = 1 << np.arange(9)
+
+
+##DTI: pieces holds the pieces of every game && localState agrees with the pieces && result agrees with localState
+##     && nextGrid is the mask of the local boards the player to move may play into (all False once a game has ended)
+class BatchBoard(object):
+
+    def __init__(self, games):
+        self.games = games
+
+        # the piece planes - pieces[n, 0] are X's pieces in game n and pieces[n, 1] are O's, as (9, 9) bools indexed [k, c]
+        self.pieces = np.zeros((games, 2, 9, 9), dtype=bool)
+
+        # the state of each local board as a result code from Playout (ONGOING, X_WIN, O_WIN or DRAW)
+        self.localState = np.zeros((games, 9), dtype=np.int8)
+
+        # the local boards each game's next move may be played into
+        self.nextGrid = np.ones((games, 9), dtype=bool)
+
+        # the side to move in each game
+        self.xToMove = np.ones(games, dtype=bool)
+
+        # the result code of each game
+        self.result = np.zeros(games, dtype=np.int8)
+
+        self.totalMoves = np.zeros(games, dtype=np.int64)
+
+    ## the legal moves of every game, as (games, 81) bools indexed by move - finished games have none
+    def legal_mask(self):
+        empty = ~(self.pieces[:,0] | self.pieces[:,1])
+        return (empty & self.nextGrid[:,:,None]).reshape(self.games, 81)
+
+    ## make one move in every game, given an array of (games,) move indexes - the moves of games that have already ended are ignored
+    ## like Board.make_move, the moves are not checked for legality
+    def step(self, moves):
+        active = np.flatnonzero(self.result == ONGOING)
+        moves = np.asarray(moves)[active]
+        k = moves // 9
+        c = moves % 9
+        player = np.where(self.xToMove[active], 0, 1)
+
+        self.pieces[active, player, k, c] = True
+        self.totalMoves[active] += 1
+
+        ## update the local board that was played into
+        mine = self.pieces[active, player, k] @ BITS
+        theirs = self.pieces[active, 1 - player, k] @ BITS
+        won = WINNING_ARRAY[mine]
+        local = np.where(won, np.where(player == 0, X_WIN, O_WIN), np.where((mine | theirs) == 0b111111111, DRAW, ONGOING))
+        self.localState[active, k] = local
+
+        ## update the global state, then the local boards the next move may be played into
+        ## a game is drawn as soon as neither player can still win (see Board.nobody_can_win)
+        states = self.localState[active]
+        openBoards = states == ONGOING
+        xWon = (states == X_WIN) @ BITS
+        oWon = (states == O_WIN) @ BITS
+        xWinnable = ((states == X_WIN) | (openBoards & OPEN_LINE_ARRAY[self.pieces[active, 1] @ BITS])) @ BITS
+        oWinnable = ((states == O_WIN) | (openBoards & OPEN_LINE_ARRAY[self.pieces[active, 0] @ BITS])) @ BITS
+        self.result[active] = game_results(xWon, oWon, xWinnable, oWinnable)
+
+        forced = openBoards[np.arange(len(active)), c]
+        nextGrid = np.where(forced[:,None], np.arange(9) == c[:,None], openBoards)
+        nextGrid[self.result[active] != ONGOING] = False
+        self.nextGrid[active] = nextGrid
+
+        self.xToMove[active] = ~self.xToMove[active]
+
+    ## whether each game has ended
+    def terminal(self):
+        return self.result != ONGOING
+
+    ## every game's position as Board.export gives it, as a (games, 9, 9) array from the perspective of the player to move
+    ## a square holds 1 for the player to move's piece, -1 for the opponent's and 0.1 if it is empty, and won local boards are all 1 or -1
+    ## the array is written into out if it is given
+    def export(self, out=None):
+        mover = np.where(self.xToMove, 0, 1)
+        rows = np.arange(self.games)
+        own = self.pieces[rows, mover]
+        other = self.pieces[rows, 1 - mover]
+
+        array = out
+        if array is None:
+            array = np.empty((self.games, 9, 9))
+        array.fill(0.1)
+        array[own] = 1
+        array[other] = -1
+
+        wonByMover = np.where(self.xToMove[:,None], self.localState == X_WIN, self.localState == O_WIN)
+        wonByOther = np.where(self.xToMove[:,None], self.localState == O_WIN, self.localState == X_WIN)
+        array[wonByMover] = 1
+        array[wonByOther] = -1
+        return array
+
+    ## the position of game n in the form of Board.snapshot, for playouts or for setting up a Board
+    def snapshot(self, n):
+        xBits = tuple(int(mask) for mask in self.pieces[n, 0] @ BITS)
+        oBits = tuple(int(mask) for mask in self.pieces[n, 1] @ BITS)
+        grids = np.flatnonzero(self.nextGrid[n])
+        grid = int(grids[0]) if len(grids) == 1 else -1
+        return (xBits, oBits, "X" if self.xToMove[n] else "O", grid)
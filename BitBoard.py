@@ -0,0 +1,492 @@
+## Ultimate Tic Tac Toe Board implementation using bitboards
+## A drop-in replacement for Board.Board (same public methods and attributes) that stores each player's pieces as integer bitmasks
+
+## comment terminology : local board/grid refers to a 3x3 normal tic tac toe board, global refers to the 3x3x3x3 ultimate board
+## local board (x,y) is stored at index k = 3*x + y, and square (i,j) within a local board is bit c = 3*i + j of that board's mask
+
+import random
+import numpy as np
+
+from Board import Board, MoveMemento, EMPTY_HISTORY
+from LocalTables import FULL, WINNING, OPEN_LINE, MOVES, COUNTS, PLAYABLE, TRITS, DEAD
+import Zobrist
+
+## GRIDS[k] is the (x,y) tuple of local board k, shared so that next_grid doesn't need a new tuple every move
+GRIDS = tuple((k // 3, k % 3) for k in range(9))
+
+## BIT_PLANES[mask] is the (9,) bools of the bits set in a 9 bit mask, so BIT_PLANES[self.xBits] is X's (9,9) piece plane
+BIT_PLANES = np.array([[mask >> c & 1 for c in range(9)] for mask in range(FULL + 1)], dtype=bool)
+
+
+##DTI: xBits/oBits hold the pieces of each local board && localState, xWon, oWon and doneMask agree with the pieces && moves retains the sequence of moves leading to the board state
+class BitBoard(object):
+
+    def __init__(self, filename=None):
+
+        self.estr = "E"
+        self.xstr = "X"
+        self.ostr = "O"
+        self.fullstr = "F"
+        self.drawstr = "D"
+
+        # store strings for various board states
+        self.stateDict = {"X win":self.xstr, "O win":self.ostr, "draw":self.drawstr, "full":self.fullstr, "ongoing":self.estr}
+
+        # the MoveMementos of the moves that have been made, most recent first - for undoing moves (see Board.MoveHistory)
+        self.moves = EMPTY_HISTORY
+
+        # one 9 bit mask per local board for each player
+        self.xBits = [0] * 9
+        self.oBits = [0] * 9
+        self.next_player = self.xstr
+        self.next_grid = None # the local grid that the next player is to play into. None if the player can play anywhere, a 2-tuple of local grid coordinates otherwise
+
+        self.totalMoves = 0
+
+        # potentially load up a stored game from a text file
+        if filename != None:
+            with open(filename, 'r') as file:
+                filestring = file.read().replace("\n", "")
+                self.load_board(filestring)
+
+        # set up the local and global state masks from the pieces
+        self.load_caches()
+
+    ## the (3x3)x(3x3) grid of "X", "O" and "E" strings, built from the bitmasks (read only - moves must go through make_move)
+    @property
+    def grid(self):
+        grid = [[[[self.estr for j in range(3)] for i in range(3)] for y in range(3)] for x in range(3)]
+        for k in range(9):
+            local = grid[k // 3][k % 3]
+            xbits, obits = self.xBits[k], self.oBits[k]
+            for c in range(9):
+                if xbits >> c & 1:
+                    local[c // 3][c % 3] = self.xstr
+                elif obits >> c & 1:
+                    local[c // 3][c % 3] = self.ostr
+        return grid
+
+    ## represent the board state with the current player as 1s, the opposition as -1, and empty spaces as 0.1
+    ## the planes are looked up from the bitmasks, and the array is written into out if it is given (see Board.export)
+    def export(self, out=None):
+        own, opp, ownWon, oppWon = self.perspective_masks()
+        return Board.encode(BIT_PLANES[own], BIT_PLANES[opp], BIT_PLANES[ownWon], BIT_PLANES[oppWon], out)
+
+    ## the position as (4,9,9) planes from the perspective of the player to move, as Board.export_planes
+    def export_planes(self, out=None):
+        own, opp, ownWon, oppWon = self.perspective_masks()
+        if self.next_grid == None:
+            allowed = FULL ^ self.doneMask
+        else:
+            x,y = self.next_grid
+            allowed = (1 << 3*x + y) & ~self.doneMask
+        legal = [FULL ^ (own[k] | opp[k]) if allowed >> k & 1 else 0 for k in range(9)]
+        return Board.encode_planes(BIT_PLANES[own], BIT_PLANES[opp], BIT_PLANES[legal], BIT_PLANES[ownWon], BIT_PLANES[oppWon], out)
+
+    ## the piece masks and won local board masks of the player to move and of the opponent
+    def perspective_masks(self):
+        if self.next_player == self.xstr:
+            return self.xBits, self.oBits, self.xWon, self.oWon
+        return self.oBits, self.xBits, self.oWon, self.xWon
+
+    def letter_to_int(self, letter):
+        if letter == self.next_player:
+            return 1
+        if letter == self.player_just_played():
+            return -1
+        else:
+            return 0.1
+
+    # loads the board from a string, in the same format as Board.load_board
+    def load_board(self, filestring):
+
+        self.next_player = filestring[0]
+        if filestring[1] == "N":
+            self.next_grid = None
+        else:
+            self.next_grid = (int(filestring[1]), int(filestring[2]))
+        filestring = filestring[3:]
+        counter = 0
+        for x in range(3):
+            for i in range(3):
+                for y in range(3):
+                    for j in range(3):
+                        s = filestring[counter]
+                        bit = 1 << (3*i + j)
+                        if s == self.xstr:
+                            self.xBits[3*x + y] |= bit
+                        elif s == self.ostr:
+                            self.oBits[3*x + y] |= bit
+                        if s != self.estr:
+                            self.totalMoves += 1
+                        counter += 1
+
+    ## saves the current board state to a given filename, in the same format as Board.save_board
+    def save_board(self, filename):
+        grid = self.grid
+        filestring = self.next_player
+        if self.next_grid == None:
+            filestring += "NA"
+        else:
+            filestring += str(self.next_grid[0]) + str(self.next_grid[1])
+        for y in range(3):
+            for j in range(3):
+                filestring += "\n"
+                for x in range(3):
+                    for i in range(3):
+                        filestring += self.convert_state_to_str(grid[x][y][i][j])
+        with open(filename, "w") as file:
+            file.write(filestring)
+
+    ## set the board to the position of a snapshot (see Board.snapshot), with no move history
+    def load_snapshot(self, snapshot):
+        xBits, oBits, player, grid = snapshot
+        self.xBits = list(xBits)
+        self.oBits = list(oBits)
+        self.totalMoves = sum(COUNTS[self.xBits[k] | self.oBits[k]] for k in range(9))
+        self.next_player = player
+        self.next_grid = None if grid == -1 else (grid // 3, grid % 3)
+        self.moves = EMPTY_HISTORY
+        self.load_caches()
+
+    ## set the board to a GameRecord's start position and make its moves up to ply (or all of them), as Board.load_record
+    def load_record(self, record, ply=None):
+        self.load_snapshot(record.start)
+        for index in record.moves[:ply]:
+            self.make_move(index // 27, index // 9 % 3, index // 3 % 3, index % 3)
+
+    ## work out the state of every local board, and the global won/done masks, from the pieces
+    def load_caches(self):
+        self.localState = [self.calculate_local_game_state(k // 3, k % 3) for k in range(9)]
+        self.xWon = 0
+        self.oWon = 0
+        self.doneMask = 0
+        self.xWinnable = 0 # the local boards X has won or can still win, as a 9 bit mask (see Board.nobody_can_win)
+        self.oWinnable = 0 # the same for O
+        self.pieceHash = 0 # the xor of the Zobrist keys of every piece on the board
+        for k in range(9):
+            for c in range(9):
+                if self.xBits[k] >> c & 1:
+                    self.pieceHash ^= Zobrist.PIECE_KEYS[self.xstr][9*k + c]
+                elif self.oBits[k] >> c & 1:
+                    self.pieceHash ^= Zobrist.PIECE_KEYS[self.ostr][9*k + c]
+            state = self.localState[k]
+            if state == self.xstr:
+                self.xWon |= 1 << k
+            elif state == self.ostr:
+                self.oWon |= 1 << k
+            if state != self.estr:
+                self.doneMask |= 1 << k
+            self.update_winnable(k)
+
+    ## update the winnable masks for local board k from its state and pieces
+    def update_winnable(self, k):
+        bit = 1 << k
+        state = self.localState[k]
+        if state == self.xstr or (state == self.estr and OPEN_LINE[self.oBits[k]]):
+            self.xWinnable |= bit
+        else:
+            self.xWinnable &= ~bit
+        if state == self.ostr or (state == self.estr and OPEN_LINE[self.xBits[k]]):
+            self.oWinnable |= bit
+        else:
+            self.oWinnable &= ~bit
+
+    ## calculate and return the state of a local 3x3 grid within the global grid, at position x,y (0 <= x, y <= 2)
+    def calculate_local_game_state(self, x, y):
+        k = 3*x + y
+        if WINNING[self.xBits[k]]:
+            return self.stateDict["X win"]
+        if WINNING[self.oBits[k]]:
+            return self.stateDict["O win"]
+        if self.xBits[k] | self.oBits[k] == FULL:
+            return self.stateDict["full"]
+        return self.stateDict["ongoing"]
+
+    ## return the current state of the board, i.e. win, loss, draw (including inevitable draws) or in-play
+    ## called after every move of a playout, so nobody_can_win is inlined
+    def game_state(self):
+        if WINNING[self.xWon]:
+            return self.xstr
+        if WINNING[self.oWon]:
+            return self.ostr
+        if not (WINNING[self.xWinnable] or WINNING[self.oWinnable]) or not self.has_valid_moves():
+            return self.drawstr
+        return self.estr
+
+    ## return if neither player can still win the game (see Board.nobody_can_win)
+    def nobody_can_win(self):
+        return not WINNING[self.xWinnable] and not WINNING[self.oWinnable]
+
+    ## the global board is drawn if every line holds a local board won by X and one won by O
+    def inevitable_draw(self):
+        return DEAD[TRITS[self.xWon] + 2*TRITS[self.oWon]]
+
+    ## returns if a given line (a,b,c) can be won by either play. a, b and c are states in self.stateDict
+    def winnable_line(self, a, b, c):
+        for full in (self.stateDict["draw"], self.stateDict["full"]):
+            if a == full or b == full or c == full:
+                return False
+
+        xwin = self.stateDict["X win"]
+        owin = self.stateDict["O win"]
+        xPresent = a == xwin or b== xwin or c == xwin
+        oPresent = a == owin or b== owin or c == owin
+        return not(xPresent and oPresent)
+
+    ## return the state of a local 3x3 grid within the global grid, at position x,y (0 <= x, y <= 2)
+    def local_game_state(self, x, y):
+        return self.localState[3*x + y]
+
+    ## return if a local 3x3 grid can't be played in
+    def square_done(self, x, y):
+        return self.doneMask >> (3*x + y) & 1 == 1
+
+    # a function to convert the state of a self.grid square to a string
+    def convert_state_to_str(self, state):
+        return state
+
+    ## change the self.next_player variable to the other player
+    def change_player(self):
+        if self.next_player == self.xstr:
+            self.next_player = self.ostr
+        else:
+            self.next_player = self.xstr
+
+    ## update the self.next_grid variable to show where the next player has to play
+    def update_next_grid(self, x, y):
+        if self.doneMask >> (3*x + y) & 1:
+            self.next_grid = None
+        else:
+            self.next_grid = GRIDS[3*x + y]
+
+    ## make a move (x,y,i,j) on the board, provided it is valid
+    ## store the move as a memento in the self.moves history
+    ## the winnable masks are set in the branch that knows how the move left local board k (see update_winnable) - a move by X
+    ## only changes whether O can still win the board, unless it ends the board
+    def make_move(self, x, y, i, j):
+        k = 3*x + y
+        c = 3*i + j
+        bit = 1 << c
+        xBits, oBits = self.xBits, self.oBits
+        if (self.next_grid == None or (x,y) == self.next_grid) and not (xBits[k] | oBits[k]) & bit and not self.doneMask >> k & 1:
+            player = self.next_player
+            self.moves = self.moves.push(MoveMemento((x,y,i,j), player, self.next_grid))
+            self.pieceHash ^= Zobrist.PIECE_KEYS[player][9*k + c]
+            kBit = 1 << k
+
+            if player == self.xstr:
+                pieces = xBits[k] | bit
+                xBits[k] = pieces
+                if WINNING[pieces]:
+                    self.localState[k] = self.xstr
+                    self.xWon |= kBit
+                    self.doneMask |= kBit
+                    self.oWinnable &= ~kBit
+                elif pieces | oBits[k] == FULL:
+                    self.localState[k] = self.fullstr
+                    self.doneMask |= kBit
+                    self.xWinnable &= ~kBit
+                    self.oWinnable &= ~kBit
+                elif not OPEN_LINE[pieces]:
+                    self.oWinnable &= ~kBit
+                self.next_player = self.ostr
+            else:
+                pieces = oBits[k] | bit
+                oBits[k] = pieces
+                if WINNING[pieces]:
+                    self.localState[k] = self.ostr
+                    self.oWon |= kBit
+                    self.doneMask |= kBit
+                    self.xWinnable &= ~kBit
+                elif pieces | xBits[k] == FULL:
+                    self.localState[k] = self.fullstr
+                    self.doneMask |= kBit
+                    self.xWinnable &= ~kBit
+                    self.oWinnable &= ~kBit
+                elif not OPEN_LINE[pieces]:
+                    self.xWinnable &= ~kBit
+                self.next_player = self.xstr
+
+            if self.doneMask >> c & 1:
+                self.next_grid = None
+            else:
+                self.next_grid = GRIDS[c]
+            self.totalMoves += 1
+        else:
+            print("move failed ({} {} {} {})".format(x,y,i,j))
+
+    ## undo the last move made
+    ## a move can only be made into an ongoing local board, so undoing it always leaves that board ongoing
+    ## a player who had won the board could still win it with one piece fewer, so only the opponent's winnable bit can change
+    ## unless the board was filled without a winner
+    def un_make_move(self):
+        if len(self.moves) > 0:
+            self.totalMoves -= 1
+
+            move = self.moves.last
+            self.moves = self.moves.previous
+            x,y,i,j = move.pos
+            k = 3*x + y
+            c = 3*i + j
+            kBit = 1 << k
+
+            self.next_player = move.player
+            self.next_grid = move.localgrid
+            self.pieceHash ^= Zobrist.PIECE_KEYS[move.player][9*k + c]
+            if move.player == self.xstr:
+                pieces = self.xBits[k] & ~(1 << c)
+                self.xBits[k] = pieces
+                if OPEN_LINE[pieces]:
+                    self.oWinnable |= kBit
+            else:
+                pieces = self.oBits[k] & ~(1 << c)
+                self.oBits[k] = pieces
+                if OPEN_LINE[pieces]:
+                    self.xWinnable |= kBit
+
+            if self.doneMask >> k & 1:
+                if self.localState[k] == self.fullstr:
+                    if OPEN_LINE[self.oBits[k]]:
+                        self.xWinnable |= kBit
+                    if OPEN_LINE[self.xBits[k]]:
+                        self.oWinnable |= kBit
+                notK = ~kBit
+                self.localState[k] = self.estr
+                self.xWon &= notK
+                self.oWon &= notK
+                self.doneMask &= notK
+
+    ## a 64 bit Zobrist key for the position - the pieces, the player to move and the grid they must play in
+    ## the same position gives the same key on a Board and a BitBoard
+    @property
+    def zobrist_key(self):
+        return self.pieceHash ^ Zobrist.turn_key(self.next_player, self.next_grid)
+
+    ## the canonical key of the position and the symmetry that gives it, as (key, transform) - see Board.canonical
+    def canonical(self):
+        return Zobrist.canonical_key(self.xBits, self.oBits, self.next_player, self.next_grid)
+
+    ## test if three variables are equal (assuming transitivity)
+    def equal3(self, a, b, c):
+        return a == b and b == c
+
+    ## return if the next player has any move available, without building the move list
+    def has_valid_moves(self):
+        if self.next_grid == None:
+            return self.doneMask != FULL
+        x,y = self.next_grid
+        k = 3*x + y
+        return not self.doneMask >> k & 1 and self.xBits[k] | self.oBits[k] != FULL
+
+    ## get a list of valid moves for the next player
+    def get_valid_moves(self):
+        xBits, oBits = self.xBits, self.oBits
+        if self.next_grid == None:
+            moves = []
+            done = self.doneMask
+            for k in range(9):
+                if not done >> k & 1:
+                    moves += MOVES[k][FULL ^ (xBits[k] | oBits[k])]
+            return moves
+        x,y = self.next_grid
+        k = 3*x + y
+        if self.doneMask >> k & 1:
+            return []
+        return list(MOVES[k][FULL ^ (xBits[k] | oBits[k])])
+
+    ## the valid moves for the next player as a read-only tuple (see Board.legal_moves)
+    def legal_moves(self):
+        boards = self.playable_boards()
+        xBits, oBits = self.xBits, self.oBits
+        if len(boards) == 1:
+            k = boards[0]
+            return MOVES[k][FULL ^ (xBits[k] | oBits[k])]
+        moves = ()
+        for k in boards:
+            moves += MOVES[k][FULL ^ (xBits[k] | oBits[k])]
+        return moves
+
+    ## the valid moves as an 81 bit mask, with bit 27*x + 9*y + 3*i + j set for each valid move (x,y,i,j)
+    def legal_move_mask(self):
+        mask = 0
+        for k in self.playable_boards():
+            mask |= (FULL ^ (self.xBits[k] | self.oBits[k])) << 9*k
+        return mask
+
+    ## the number of valid moves
+    def legal_move_count(self):
+        return sum(COUNTS[FULL ^ (self.xBits[k] | self.oBits[k])] for k in self.playable_boards())
+
+    ## a valid move chosen uniformly at random without building the list of moves (see Board.random_legal_move)
+    def random_legal_move(self):
+        boards = self.playable_boards()
+        xBits, oBits = self.xBits, self.oBits
+        if len(boards) == 1:
+            moves = MOVES[boards[0]][FULL ^ (xBits[boards[0]] | oBits[boards[0]])]
+            if len(moves) == 0:
+                return None
+            return moves[random.randrange(len(moves))]
+
+        count = sum(COUNTS[FULL ^ (xBits[k] | oBits[k])] for k in boards)
+        if count == 0:
+            return None
+        choice = random.randrange(count)
+        for k in boards:
+            moves = MOVES[k][FULL ^ (xBits[k] | oBits[k])]
+            if choice < len(moves):
+                return moves[choice]
+            choice -= len(moves)
+
+    ## the local boards 3*x + y the next player may play in
+    def playable_boards(self):
+        if self.next_grid == None:
+            return PLAYABLE[self.doneMask]
+        x,y = self.next_grid
+        k = 3*x + y
+        if self.doneMask >> k & 1:
+            return ()
+        return (k,)
+
+    ## get the last move played
+    def get_last_move(self):
+        if len(self.moves) > 0:
+            move = self.moves.last
+            return move.pos
+        else:
+            return None
+
+    ## a compact, picklable snapshot of the position for the playout functions in Playout.py (see Board.snapshot)
+    def snapshot(self):
+        if self.next_grid == None:
+            grid = -1
+        else:
+            grid = 3*self.next_grid[0] + self.next_grid[1]
+        return (tuple(self.xBits), tuple(self.oBits), self.next_player, grid)
+
+    ## create a copy of this board
+    def copy(self):
+        newBoard = BitBoard.__new__(BitBoard)
+        newBoard.__dict__.update(self.__dict__)
+
+        newBoard.stateDict = dict(self.stateDict) # the move history is immutable, so it is shared
+        newBoard.xBits = list(self.xBits)
+        newBoard.oBits = list(self.oBits)
+        newBoard.localState = list(self.localState)
+
+        return newBoard
+
+    ## a copy of the board for searching from, with no move history (see Board.search_copy)
+    def search_copy(self):
+        newBoard = self.copy()
+        newBoard.moves = EMPTY_HISTORY
+        return newBoard
+
+    def player_just_played(self):
+        if self.next_player == self.xstr:
+            return self.ostr
+        return self.xstr
+
+    flatten_2D = Board.flatten_2D
+    flatten = Board.flatten
+    unflatten = Board.unflatten
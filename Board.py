@@ -5,11 +5,19 @@
 import random
 import tkinter as tk
 import time
-import copy
 import math
 import numpy as np
 
-##DTI: board is valid && line caches remain valid && moves retains the sequence of moves leading to the board state && 
+import Zobrist
+from LocalTables import FULL, WINNING, MOVES, COUNTS, PLAYABLE, POWERS, PIECE_TRIT, STATE, EMPTY, X_MASK, O_MASK, X_WINNABLE, O_WINNABLE, line_counts
+
+## the value a local board in each state adds to the global key (only won local boards count)
+WON_TRIT = {"X": 1, "O": 2, "F": 0, "E": 0}
+
+## the planes of Board.planes, which hold the position as (9,9) bools indexed [3*x + y, 3*i + j] (the layout of Board.export)
+X_PLANE, O_PLANE, X_WON_PLANE, O_WON_PLANE = range(4)
+
+##DTI: board is valid && local and global keys remain valid && moves retains the sequence of moves leading to the board state && 
 class Board(object):
 
     def __init__(self, filename=None):
@@ -21,8 +29,9 @@ class Board(object):
         # store strings for various board states
         self.stateDict = {"X win":self.xstr, "O win":self.ostr, "draw":"D", "full":"F", "ongoing":self.estr}
 
-        # a list of MoveMementos in order of the moves that have been made - for undoing moves
-        self.moves = []
+        # the MoveMementos of the moves that have been made, most recent first - for undoing moves
+        # the history is immutable, so copies of the board share it
+        self.moves = EMPTY_HISTORY
 
         # the (3x3)x(3x3) grid storing whether each mini square is a X, O or empty
         self.grid = [[[[self.estr for i in range(3)] for j in range(3)] for k in range(3)] for l in range(3)]
@@ -41,26 +50,52 @@ class Board(object):
         self.load_caches()
 
     ## represent the board state with the current player as 1s, the opposition as -1, and empty spaces as 0.1
-    def export(self):
-        array = np.zeros((3,3,3,3))
-        for x in range(3):
-            for y in range(3):
-                state = self.local_game_state(x,y)
-                if (state == self.stateDict["X win"] and self.next_player == self.xstr) or (state == self.stateDict["O win"] and self.next_player == self.ostr):
-                    array[x,y] += 1
-                elif (state == self.stateDict["X win"] and self.next_player == self.ostr) or (state == self.stateDict["O win"] and self.next_player == self.xstr):
-                    array[x,y] -= 1
-                else:
-                    for a in range(9):
-                        i,j = divmod(a, 3)
-                        if self.grid[x][y][i][j] == self.next_player:
-                            array[x,y,i,j] = 1
-                        elif self.grid[x][y][i][j] == self.estr:
-                            array[x,y,i,j] = 0.1
-                        else:
-                            array[x,y,i,j] = -1
-        
-        return Board.flatten_2D(array)
+    ## the (9,9) array is built from self.planes, and is written into out if it is given (e.g. a row of a preallocated batch)
+    def export(self, out=None):
+        own, opp, ownWon, oppWon = self.perspective_planes()
+        return Board.encode(own, opp, ownWon, oppWon, out)
+
+    ## the position as (4,9,9) planes from the perspective of the player to move: their pieces, the opponent's pieces,
+    ## the legal moves, and the won local boards (1 for the player to move, -1 for the opponent), written into out if it is given
+    def export_planes(self, out=None):
+        own, opp, ownWon, oppWon = self.perspective_planes()
+        allowed = self.openBoards.copy()
+        if self.next_grid != None:
+            x,y = self.next_grid
+            allowed[:3*x + y] = False
+            allowed[3*x + y + 1:] = False
+        legal = ~(own | opp) & allowed[:,None]
+        return Board.encode_planes(own, opp, legal, ownWon, oppWon, out)
+
+    ## the piece planes and won local boards (as (9,) bools) of the player to move and of the opponent
+    def perspective_planes(self):
+        planes = self.planes
+        if self.next_player == self.xstr:
+            return planes[X_PLANE], planes[O_PLANE], planes[X_WON_PLANE][:,0], planes[O_WON_PLANE][:,0]
+        return planes[O_PLANE], planes[X_PLANE], planes[O_WON_PLANE][:,0], planes[X_WON_PLANE][:,0]
+
+    ## the export array of a position, given (9,9) bools of each player's pieces and (9,) bools of their won local boards
+    def encode(own, opp, ownWon, oppWon, out=None):
+        if out is None:
+            out = np.empty((9,9))
+        out.fill(0.1)
+        np.copyto(out, 1, where=own)
+        np.copyto(out, -1, where=opp)
+        out[ownWon] = 1
+        out[oppWon] = -1
+        return out
+
+    ## the export_planes array of a position, given (9,9) bools of each player's pieces and the legal moves, and (9,) bools of their won local boards
+    def encode_planes(own, opp, legal, ownWon, oppWon, out=None):
+        if out is None:
+            out = np.empty((4,9,9))
+        out[0] = own
+        out[1] = opp
+        out[2] = legal
+        out[3] = 0
+        out[3][ownWon] = 1
+        out[3][oppWon] = -1
+        return out
 
     def flatten_2D(array):
         return np.reshape(array, (9,9))
@@ -119,164 +154,140 @@ class Board(object):
         with open(filename, "w") as file:
             file.write(filestring)
 
+    ## set the board to the position of a snapshot (see Board.snapshot), with no move history
+    def load_snapshot(self, snapshot):
+        xBits, oBits, player, grid = snapshot
+        self.grid = [[[[self.estr for j in range(3)] for i in range(3)] for y in range(3)] for x in range(3)]
+        self.totalMoves = 0
+        for k in range(9):
+            for c in range(9):
+                if xBits[k] >> c & 1:
+                    self.grid[k // 3][k % 3][c // 3][c % 3] = self.xstr
+                    self.totalMoves += 1
+                elif oBits[k] >> c & 1:
+                    self.grid[k // 3][k % 3][c // 3][c % 3] = self.ostr
+                    self.totalMoves += 1
+        self.next_player = player
+        self.next_grid = None if grid == -1 else (grid // 3, grid % 3)
+        self.moves = EMPTY_HISTORY
+        self.load_caches()
+
+    ## set the board to a GameRecord's start position and make its moves up to ply (or all of them), so the moves can be undone back to the start
+    def load_record(self, record, ply=None):
+        self.load_snapshot(record.start)
+        for index in record.moves[:ply]:
+            self.make_move(index // 27, index // 9 % 3, index // 3 % 3, index % 3)
+
     ## initialise key caches that improve performance.
-    # In particular, each 3x3 grid (local and global) has the number of Xs and Os in each line stored so that the state of the grid can be ascertained efficiently
+    # In particular, each 3x3 grid (local and global) is kept as a base-3 key into the tables in LocalTables, so that the state of the grid is a lookup
     def load_caches(self):
-        self.localLinesX = [[ [[0,0,0],[0,0,0],[0,0]] for y in range(3)] for x in range(3)]   # caching the number of Xs in each line of each local board, given by verticals, horizontals and diagonals
-        self.localLinesO = [[ [[0,0,0],[0,0,0],[0,0]] for y in range(3)] for x in range(3)]  # same for Os
+        self.localKeys = [0] * 9 # the base-3 key of each local board 3*x + y (see LocalTables)
+        self.globalKey = 0 # the base-3 key of the global board, with a 1 or 2 for each local board won by X or O
+        self.doneMask = 0 # the local boards that can't be played in, as a 9 bit mask
+        self.xWinnable = FULL # the local boards X has won or can still win, as a 9 bit mask
+        self.oWinnable = FULL # the same for O
+
+        self.pieceHash = 0 # the xor of the Zobrist keys of every piece on the board
 
-        self.emptySquaresDict = {}
+        # the pieces and won local boards of each player as planes for export, and which local boards can still be played in
+        self.planes = np.zeros((4,9,9), dtype=bool)
+        self.openBoards = np.ones(9, dtype=bool)
 
         for x in range(3):
             for y in range(3):
-                self.emptySquaresDict[str(x)+str(y)] = []
                 for i in range(3):
                     for j in range(3):
                         if self.grid[x][y][i][j] == self.xstr:
-                            self.update_lines(self.localLinesX[x][y], i, j, 1)
+                            self.localKeys[3*x + y] += POWERS[3*i + j] * PIECE_TRIT[self.xstr]
+                            self.pieceHash ^= Zobrist.piece_key(self.xstr, x, y, i, j)
+                            self.planes[X_PLANE, 3*x + y, 3*i + j] = True
                         elif self.grid[x][y][i][j] == self.ostr:
-                            self.update_lines(self.localLinesO[x][y], i, j, 1)
-                        else:
-                            self.emptySquaresDict[str(x)+str(y)].append((x,y,i,j))
-
-        ## do the same process as for the local board for the global board
-        self.globalLinesX = [[0,0,0],[0,0,0],[0,0]]
-        self.globalLinesO = [[0,0,0],[0,0,0],[0,0]]
-
-        for x in range(3):
-            for y in range(3):
-                state = self.calculate_local_game_state(x,y)
-                if state == self.stateDict["X win"]:
-                    self.update_lines(self.globalLinesX, x, y, 1)
-                elif state == self.stateDict["O win"]:
-                    self.update_lines(self.globalLinesO, x, y, 1)
+                            self.localKeys[3*x + y] += POWERS[3*i + j] * PIECE_TRIT[self.ostr]
+                            self.pieceHash ^= Zobrist.piece_key(self.ostr, x, y, i, j)
+                            self.planes[O_PLANE, 3*x + y, 3*i + j] = True
 
         # cache the current global board state (just the 3x3 global view)
         self.cacheGrid = [[self.calculate_local_game_state(x,y) for y in range(3)] for x in range(3)]
-
         for x in range(3):
             for y in range(3):
-                if self.square_done(x,y):
-                    self.emptySquaresDict[str(x)+str(y)] = []
+                self.update_board_state(x, y, self.stateDict["ongoing"])
 
-    ## update all the caches after a move (x,y,i,j) has been made
+    ## update all the caches after a move (x,y,i,j) has been made by self.next_player
     ## moveForward denotes whether the move is being made or undone (True = new move made)
     def update_caches(self, x, y, i, j, moveForward = True):
-        
-        self.update_localLines(x,y,i,j, moveForward)
-
-        current = self.cacheGrid[x][y]
-        self.cacheGrid[x][y] = self.calculate_local_game_state(x,y)
-        if self.inevitable_draw_cached(self.localLinesX[x][y], self.localLinesO[x][y]):
-            #self.cacheGrid[x][y] = self.stateDict["draw"]
-            pass
-
+        k = 3*x + y
         if moveForward:
-            if self.cacheGrid[x][y] != current and self.cacheGrid[x][y] in [self.stateDict["X win"], self.stateDict["O win"]] and current in [self.stateDict["full"], self.stateDict["ongoing"]]:
-                self.update_globalLines(x,y, moveForward)
+            self.localKeys[k] += POWERS[3*i + j] * PIECE_TRIT[self.next_player]
         else:
-            if self.cacheGrid[x][y] != current and current in [self.stateDict["X win"], self.stateDict["O win"]] and self.cacheGrid[x][y] in [self.stateDict["full"], self.stateDict["ongoing"]]:
-                self.update_globalLines(x,y, moveForward)
+            self.localKeys[k] -= POWERS[3*i + j] * PIECE_TRIT[self.next_player]
 
-        key = str(x)+str(y)
-        if moveForward:
-            if self.square_done(x,y):
-                self.emptySquaresDict[key] = []
-            else:
-                 self.emptySquaresDict[key].remove((x,y,i,j))
-        else:
-            if not self.square_done(x,y):
-                self.emptySquaresDict[key] = []
-                for a in range(3):
-                    for b in range(3):
-                        if self.grid[x][y][a][b] == self.estr:
-                            self.emptySquaresDict[key].append((x,y,a,b))
-            else:
-                self.emptySquaresDict[key] = []
-
-    ## helper function to update the number of symbols in a 3x3 grid on each key line
-    ## lines is the storage list (e.g. self.globalLines, or self.localLines[0][0]) 
-    def update_lines(self, lines, h, v, add):
-        lines[0][h] += add # add 1 to the horizontal line counter in line i
-        lines[1][v] += add # add 1 to the vertical line counter in line j
-        if h == v:
-            lines[2][0] += add # diagonal #1
-        if h + v == 2:
-            lines[2][1] += add # diagonal #2
-        return lines
-
-    ## update the local line caches after a move
-    def update_localLines(self, x,y,i,j, moveForward=True):
-        if moveForward:
-            add = 1
-        else:
-            add = -1
-        if self.next_player == self.xstr:
-            self.localLinesX[x][y] = self.update_lines(self.localLinesX[x][y], i, j, add)
+        current = self.cacheGrid[x][y]
+        self.cacheGrid[x][y] = STATE[self.localKeys[k]]
+        self.update_board_state(x, y, current)
+
+    ## update the global key, self.doneMask, the winnable masks and the planes for the local board at x,y from its cached state,
+    ## given the state it had before
+    def update_board_state(self, x, y, previous):
+        state = self.cacheGrid[x][y]
+        k = 3*x + y
+        key = self.localKeys[k]
+        bit = 1 << k
+        if X_WINNABLE[key]:
+            self.xWinnable |= bit
         else:
-            self.localLinesO[x][y] = self.update_lines(self.localLinesO[x][y], i, j, add)
-
-    ## update the global line caches after a move
-    def update_globalLines(self, x,y, moveForward = True):
-        if moveForward:
-            add = 1
+            self.xWinnable &= ~bit
+        if O_WINNABLE[key]:
+            self.oWinnable |= bit
         else:
-            add = -1
-        if self.next_player == self.xstr:
-            self.globalLinesX = self.update_lines(self.globalLinesX, x, y, add)
+            self.oWinnable &= ~bit
+        if state == previous:
+            return
+
+        self.globalKey += POWERS[k] * (WON_TRIT[state] - WON_TRIT[previous])
+        self.planes[X_WON_PLANE, k] = state == self.stateDict["X win"]
+        self.planes[O_WON_PLANE, k] = state == self.stateDict["O win"]
+        self.openBoards[k] = state == self.stateDict["ongoing"]
+        if state == self.stateDict["ongoing"]:
+            self.doneMask &= ~(1 << k)
         else:
-            self.globalLinesO = self.update_lines(self.globalLinesO, x, y, add)
+            self.doneMask |= 1 << k
 
     ## return the current state of the board, i.e. win, loss, draw (including inevitable draws) or in-play
+    ## the global board is looked up like a local board whose squares are the won local boards
     def game_state(self):
-        
-        state = self.stateDict["ongoing"]
-
-        for direction in self.globalLinesX:
-            for line in direction:
-                if line == 3:
-                    state = self.stateDict["X win"]
-        
-        for direction in self.globalLinesO:
-            for line in direction:
-                if line == 3:
-                    state = self.stateDict["O win"]
-
-        if state == self.stateDict["ongoing"]:
-           
-            if self.inevitable_draw_cached(self.globalLinesX, self.globalLinesO) or len(self.get_valid_moves()) == 0:
-                state = self.stateDict["draw"]
-        
-        return state
-
-    ## get a line list of a local board for a given player
+        state = STATE[self.globalKey]
+        if state == self.stateDict["X win"] or state == self.stateDict["O win"]:
+            return state
+        if self.nobody_can_win() or not self.has_valid_moves():
+            return self.stateDict["draw"]
+        return self.stateDict["ongoing"]
+
+    ## return if neither player can still win the game, so that it must end in a draw
+    ## a player can only win along a line of the global board whose local boards they have all won or can all still win -
+    ## full local boards, boards won by the opponent and boards where every line holds an opponent's piece block the line for them
+    def nobody_can_win(self):
+        return not WINNING[self.xWinnable] and not WINNING[self.oWinnable]
+
+    ## get a line list of a local board for a given player (the number of their pieces in each row, column and diagonal)
     def get_local_lines(self, x, y, player):
         if player == self.xstr:
-            return self.localLinesX[x][y]
+            return line_counts(X_MASK[self.localKeys[3*x + y]])
         elif player == self.ostr:
-            return self.localLinesO[x][y]
+            return line_counts(O_MASK[self.localKeys[3*x + y]])
 
-    ## get the correct line list of the global board for a given player
+    ## get the correct line list of the global board for a given player (the number of local boards they have won in each line)
     def get_global_lines(self, player):
         if player == self.xstr:
-            return self.globalLinesX
+            return line_counts(X_MASK[self.globalKey])
         elif player == self.ostr:
-            return self.globalLinesO
-
-    ## helper function to determine whether a 3x3 grid is in an inevitable draw situation, given the line caches for the grid
-    def inevitable_draw_cached(self, linesX, linesO):
-        for a in range(len(linesX)):
-            for b in range(len(linesX[a])):
-                lineX, lineO = linesX[a][b], linesO[a][b]
-                if not (lineX > 0 and lineO > 0):
-                    return False
-        return True
+            return line_counts(O_MASK[self.globalKey])
 
     ## returns if a given line (a,b,c) can be won by either play. a, b and c are states in self.stateDict
+    ## (only the states are considered - see nobody_can_win for the exact test, which also looks inside the local boards in play)
     def winnable_line(self, a, b, c):
-        full = self.stateDict["draw"]
-        if a == full or b == full or c == full:
-            return False
+        for full in (self.stateDict["draw"], self.stateDict["full"]):
+            if a == full or b == full or c == full:
+                return False
 
         xwin = self.stateDict["X win"]
         owin = self.stateDict["O win"]
@@ -286,24 +297,7 @@ class Board(object):
 
     ## calculate and return the state of a local 3x3 grid within the global grid, at position x,y (0 <= x, y <= 2)
     def calculate_local_game_state(self, x, y):
-        for direction in self.localLinesX[x][y]:
-            for line in direction:
-                if line == 3:
-                    return self.stateDict["X win"]
-        
-        for direction in self.localLinesO[x][y]:
-            for line in direction:
-                if line == 3:
-                    return self.stateDict["O win"]
-
-        # neither won so must still be ongoing or drawn
-        count = 0
-        for i in range(3):
-            for j in range(3):
-                if self.grid[x][y][i][j] == self.estr:
-                    return self.stateDict["ongoing"]
-        #all squares must be full so return full
-        return self.stateDict["full"]
+        return STATE[self.localKeys[3*x + y]]
 
     ## return the state of a local 3x3 grid within the global grid, at position x,y (0 <= x, y <= 2)
     # states are : E for empty and in play, F for full and done, X for X win and done, O for O win and done (the symbols in self.stateDict)
@@ -334,18 +328,20 @@ class Board(object):
             self.next_grid = (x,y)
 
     ## make a move (x,y,i,j) on the board, provided it is valid
-    ## store the move as a memento in the self.moves list
+    ## store the move as a memento in the self.moves history
     def make_move(self,x,y,i,j):
         if (self.next_grid == None or (x,y) == self.next_grid) and self.grid[x][y][i][j] == self.estr and not self.square_done(x,y):
             self.grid[x][y][i][j] = self.next_player
             newMove = MoveMemento((x,y,i,j), self.next_player, self.next_grid)
+            self.pieceHash ^= Zobrist.piece_key(self.next_player, x, y, i, j)
+            self.planes[X_PLANE if self.next_player == self.xstr else O_PLANE, 3*x + y, 3*i + j] = True
 
             self.update_caches(x,y,i,j,True)
             
             self.update_next_grid(i,j)
             self.change_player()
             
-            self.moves.append(newMove)
+            self.moves = self.moves.push(newMove)
             self.totalMoves += 1
         else:
             print("move failed ({} {} {} {})".format(x,y,i,j))
@@ -356,63 +352,135 @@ class Board(object):
         if len(self.moves) > 0:
             self.totalMoves -= 1
             
-            move = self.moves.pop(-1)
+            move = self.moves.last
+            self.moves = self.moves.previous
             x,y,i,j = move.pos
 
             self.next_player = move.player
             self.next_grid = move.localgrid
             self.grid[x][y][i][j] = self.estr
+            self.pieceHash ^= Zobrist.piece_key(move.player, x, y, i, j)
+            self.planes[X_PLANE if move.player == self.xstr else O_PLANE, 3*x + y, 3*i + j] = False
 
             self.update_caches(x,y,i,j,False)
 
             
 
+    ## a 64 bit Zobrist key for the position - the pieces, the player to move and the grid they must play in
+    ## equal positions reached by different move orders have equal keys
+    @property
+    def zobrist_key(self):
+        return self.pieceHash ^ Zobrist.turn_key(self.next_player, self.next_grid)
+
+    ## the canonical key of the position and the symmetry that gives it, as (key, transform) - every position with the same canonical key is the same as this one up to a symmetry
+    ## Symmetry.transform_state(board.export(), transform) is the canonical position, a policy for this position is moved into the canonical
+    ## position's frame by Symmetry.transform_policy(policy, transform), and back by Symmetry.transform_policy(policy, Symmetry.INVERSE[transform])
+    def canonical(self):
+        return Zobrist.canonical_key([X_MASK[key] for key in self.localKeys], [O_MASK[key] for key in self.localKeys], self.next_player, self.next_grid)
+
     ## test if three variables are equal (assuming transitivity)
     def equal3(self, a, b, c):
         return a == b and b == c
 
     ## get a list of valid moves for the next player
     def get_valid_moves(self):
-        moves = []
+        return list(self.legal_moves())
+
+    ## the valid moves for the next player as a read-only tuple
+    ## when the player must play in one local board this is the shared tuple from MOVES, so nothing is built
+    def legal_moves(self):
+        boards = self.playable_boards()
+        if len(boards) == 1:
+            return MOVES[boards[0]][EMPTY[self.localKeys[boards[0]]]]
+        moves = ()
+        for k in boards:
+            moves += MOVES[k][EMPTY[self.localKeys[k]]]
+        return moves
+
+    ## the valid moves as an 81 bit mask, with bit 27*x + 9*y + 3*i + j set for each valid move (x,y,i,j)
+    def legal_move_mask(self):
+        mask = 0
+        for k in self.playable_boards():
+            mask |= EMPTY[self.localKeys[k]] << 9*k
+        return mask
+
+    ## the number of valid moves
+    def legal_move_count(self):
+        return sum(COUNTS[EMPTY[self.localKeys[k]]] for k in self.playable_boards())
+
+    def has_valid_moves(self):
+        return any(EMPTY[self.localKeys[k]] for k in self.playable_boards())
+
+    ## a valid move chosen uniformly at random (in the same way as random.choice(self.get_valid_moves())), without building the list of moves
+    ## returns None if there are no valid moves
+    def random_legal_move(self):
+        boards = self.playable_boards()
+        if len(boards) == 1:
+            moves = MOVES[boards[0]][EMPTY[self.localKeys[boards[0]]]]
+            if len(moves) == 0:
+                return None
+            return moves[random.randrange(len(moves))]
+
+        count = sum(COUNTS[EMPTY[self.localKeys[k]]] for k in boards)
+        if count == 0:
+            return None
+        choice = random.randrange(count)
+        for k in boards:
+            moves = MOVES[k][EMPTY[self.localKeys[k]]]
+            if choice < len(moves):
+                return moves[choice]
+            choice -= len(moves)
+
+    ## the local boards 3*x + y the next player may play in
+    def playable_boards(self):
         if self.next_grid == None:
-            for x in range(3):
-                for y in range(3):
-                    moves += self.emptySquaresDict[str(x)+str(y)]
-                        
-        else:
-            x,y = self.next_grid
-            moves = self.emptySquaresDict[str(x)+str(y)]
-                
-        #return moves
-        moves1 = list(moves)
-        return list(moves)
+            return PLAYABLE[self.doneMask]
+        x,y = self.next_grid
+        k = 3*x + y
+        if self.doneMask >> k & 1:
+            return ()
+        return (k,)
 
     ## get the last move played
     def get_last_move(self):
         if len(self.moves) > 0:
-            move = self.moves[-1]
+            move = self.moves.last
             return move.pos
         else:
             return None
 
+    ## a compact, picklable snapshot of the position for the playout functions in Playout.py
+    ## (X's 9 bit masks for each local board 3*x + y, O's masks, the next player, and the index 3*x + y of next_grid or -1)
+    ## the masks are read from the local keys (see LocalTables), so no squares are visited
+    def snapshot(self):
+        if self.next_grid == None:
+            grid = -1
+        else:
+            grid = 3*self.next_grid[0] + self.next_grid[1]
+        return (tuple(X_MASK[key] for key in self.localKeys), tuple(O_MASK[key] for key in self.localKeys), self.next_player, grid)
+
     ## create a copy of this board
+    ## the move history is shared rather than copied, so the cost doesn't depend on how many moves have been played
     def copy(self):
-        return copy.deepcopy(self)
-        newBoard = Board()
-
-        newBoard.grid = copy.deepcopy(self.grid)
-        newBoard.moves = list(self.moves) # mementos are not mutable so this does not need to be a deep copy
-        newBoard.next_player = str(self.next_player)
-        newBoard.next_grid = self.next_grid
-        newBoard.totalMoves = int(self.totalMoves)
-        
-        newBoard.localLinesX = copy.deepcopy(self.localLinesX)
-        newBoard.localLinesO = copy.deepcopy(self.localLinesO)
-        newBoard.globalLinesX = copy.deepcopy(self.globalLinesX)
-        newBoard.globalLinesO = copy.deepcopy(self.globalLinesO)
-        newBoard.cacheGrid = copy.deepcopy(self.cacheGrid)
-        newBoard.emptySquaresDict = copy.deepcopy(self.emptySquaresDict)
+        newBoard = Board.__new__(Board)
+        newBoard.__dict__.update(self.__dict__) # the strings, counts, next_grid tuple and move history are immutable
+
+        newBoard.stateDict = dict(self.stateDict)
+        newBoard.grid = [[[list(line) for line in local] for local in column] for column in self.grid]
+
+        newBoard.localKeys = list(self.localKeys)
+        newBoard.cacheGrid = [list(column) for column in self.cacheGrid]
+
+        newBoard.planes = self.planes.copy()
+        newBoard.openBoards = self.openBoards.copy()
+
+        return newBoard
 
+    ## a copy of the board for searching from, with no move history
+    ## moves made on it can be undone, but get_last_move and un_make_move know nothing of the moves made before the copy
+    def search_copy(self):
+        newBoard = self.copy()
+        newBoard.moves = EMPTY_HISTORY
         return newBoard
 
     def player_just_played(self):
@@ -423,9 +491,40 @@ class Board(object):
 
 ## store data that allows a move to be undone
 class MoveMemento():
+    __slots__ = ("pos", "player", "localgrid")
 
     def __init__(self, pos, player, localgrid):
         self.pos = pos
         self.player = player
         self.localgrid = localgrid
 
+## an immutable stack of MoveMementos - the last move made, and the history before it
+## pushing a move gives a new history that shares the old one, so boards copied from each other can share their histories
+class MoveHistory():
+    __slots__ = ("last", "previous", "length")
+
+    def __init__(self, last=None, previous=None):
+        self.last = last
+        self.previous = previous
+        if previous == None:
+            self.length = 0
+        else:
+            self.length = previous.length + 1
+
+    def push(self, memento):
+        return MoveHistory(memento, self)
+
+    def __len__(self):
+        return self.length
+
+    ## the mementos in the order the moves were made
+    def __iter__(self):
+        mementos = []
+        history = self
+        while history.length > 0:
+            mementos.append(history.last)
+            history = history.previous
+        return reversed(mementos)
+
+EMPTY_HISTORY = MoveHistory()
+
@@ -0,0 +1,65 @@
+## Ultimate Tic Tac Toe project - streaming training batches from the replay buffer
+## batches are drawn and augmented on a background thread, so the next batch is ready while the net trains on the current one
+
+import threading
+import queue
+import numpy as np
+
+import Symmetry
+
+
+## an endless iterator of training batches (states, (policies, results)) drawn from a ReplayBuffer, in the form Model.fit takes
+## with augment, each sample is put through one of the 8 symmetries of the board at random (Symmetry.transform_batch), the same one for its state and its policy
+## up to prefetch batches are made ahead of time by the loader's thread
+class DataLoader():
+
+    def __init__(self, replay, batchSize=32, halfLife=None, augment=True, prefetch=2, seed=None):
+        self.replay = replay
+        self.batchSize = batchSize
+        self.halfLife = halfLife
+        self.augment = augment
+        self.rng = np.random.default_rng(seed) # only used by the loader's thread
+
+        self.batches = queue.Queue(prefetch)
+        self.running = True
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    ## the loop run by the loader's thread - an error making a batch is passed on to be raised by __next__, and stops the loader
+    def run(self):
+        while self.running:
+            try:
+                batch = self.make_batch()
+            except Exception as error:
+                batch = error
+            while self.running:
+                try:
+                    self.batches.put(batch, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+            if isinstance(batch, Exception):
+                break
+
+    ## draw and augment one batch
+    def make_batch(self):
+        states, policies, results = self.replay.sample(self.batchSize, self.halfLife, self.rng)
+        if self.augment:
+            transforms = self.rng.integers(0, Symmetry.COUNT, len(results))
+            states, policies = Symmetry.transform_batch(states, policies, transforms)
+        return states, (policies, results)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        batch = self.batches.get()
+        if isinstance(batch, Exception):
+            raise batch
+        return batch
+
+    ## stop the loader's thread
+    def close(self):
+        self.running = False
+        self.thread.join()
@@ -0,0 +1,169 @@
+## evaluation of board positions by the neural net
+## a single position costs almost as much to predict as a whole batch, so positions are queued up and sent to the net together
+
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+
+## collects positions (board.export() arrays) from any number of searches and evaluates them with the net in batches
+## a batch is sent when batchSize positions are waiting, or when the oldest has waited maxWait seconds since it was submitted
+class BatchEvaluator():
+
+    def __init__(self, neuralNet, batchSize=16, maxWait=0.005):
+        self.neuralNet = neuralNet
+        self.batchSize = batchSize
+        self.maxWait = maxWait
+
+        self.pending = [] # (state, Evaluation, submitted time) triples waiting to be sent, oldest first
+        self.condition = threading.Condition()
+        self.running = True
+
+        self.batches = 0
+        self.evaluated = 0
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    ## queue a position for evaluation, returning an Evaluation to get the (policy, value) from
+    def submit(self, state):
+        evaluation = Evaluation()
+        with self.condition:
+            self.pending.append((state, evaluation, time.time()))
+            # wake the evaluating thread, to start timing the batch or to send it if it is full
+            self.condition.notify()
+        return evaluation
+
+    ## the loop of the evaluating thread - wait for a full batch or for the oldest position to time out, then evaluate
+    ## the positions left over from a batch keep their submitted times, so none of them waits more than maxWait for a batch to be sent
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running and (len(self.pending) == 0 or (len(self.pending) < self.batchSize and time.time() < self.oldest() + self.maxWait)):
+                    if len(self.pending) == 0:
+                        self.condition.wait()
+                    else:
+                        self.condition.wait(self.oldest() + self.maxWait - time.time())
+                if len(self.pending) == 0:
+                    return
+                batch = self.pending[:self.batchSize]
+                self.pending = self.pending[self.batchSize:]
+            self.evaluate(batch)
+
+    ## the time the oldest pending position was submitted (there must be one)
+    def oldest(self):
+        return self.pending[0][2]
+
+    ## run a batch of positions through the net and hand each result back
+    def evaluate(self, batch):
+        try:
+            policies, values = self.neuralNet.predict(np.array([state for state, evaluation, submitted in batch]))
+        except Exception as error:
+            for state, evaluation, submitted in batch:
+                evaluation.fail(error)
+            return
+        self.batches += 1
+        self.evaluated += len(batch)
+        for n, (state, evaluation, submitted) in enumerate(batch):
+            evaluation.set(policies[n], values[n][0])
+
+    ## evaluate any positions still waiting, and stop the evaluating thread
+    def close(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join()
+
+
+## the result of a position submitted to a BatchEvaluator, available once its batch has been evaluated
+class Evaluation():
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.policy = None
+        self.value = None
+        self.error = None
+
+    def set(self, policy, value):
+        self.policy = policy
+        self.value = value
+        self.event.set()
+
+    def fail(self, error):
+        self.error = error
+        self.event.set()
+
+    ## wait for the evaluation, and return the (policy, value) pair
+    def result(self):
+        self.event.wait()
+        if self.error != None:
+            raise self.error
+        return self.policy, self.value
+
+
+## a size-bounded cache of the net's (policy, value) for positions, keyed by the position's hash
+## when full, the least recently used position is evicted
+class EvaluationCache():
+
+    def __init__(self, maxSize=100000):
+        self.maxSize = maxSize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    ## the cached (policy, value) for a key, or None
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry == None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, policy, value):
+        self.entries[key] = (policy, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    ## empty the cache, e.g. when the net's weights have changed
+    def clear(self):
+        self.entries.clear()
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        if total == 0:
+            return 0
+        return self.hits / total
+
+    def __repr__(self):
+        return "EvaluationCache || Size {} / {} || Hits {} || Misses {} || Evictions {}".format(len(self.entries), self.maxSize, self.hits, self.misses, self.evictions)
+
+
+## one cache per net, shared by every search in the process that asks for it
+sharedCaches = {}
+
+def shared_cache(neuralNet, maxSize=100000):
+    if id(neuralNet) not in sharedCaches:
+        sharedCaches[id(neuralNet)] = EvaluationCache(maxSize)
+    return sharedCaches[id(neuralNet)]
+
+## one batch evaluator per net, shared by every search in the process that asks for it - it is closed with close_shared_evaluator, not by the searches
+sharedEvaluators = {}
+
+def shared_evaluator(neuralNet, batchSize=16, maxWait=0.005):
+    if id(neuralNet) not in sharedEvaluators:
+        sharedEvaluators[id(neuralNet)] = BatchEvaluator(neuralNet, batchSize, maxWait)
+    return sharedEvaluators[id(neuralNet)]
+
+def close_shared_evaluator(neuralNet):
+    evaluator = sharedEvaluators.pop(id(neuralNet), None)
+    if evaluator != None:
+        evaluator.close()
@@ -1,14 +1,17 @@
 import time
 from Board import Board
 from GUI_Classes import GUI
+from GameRecord import GameRecordWriter, record_board
 
 
 ## a class to manage the interaction between player and AI, while keeping the GUI alive
 class GameManager():
 
-    def __init__(self, p1Strat, p2Strat, root=None, file=None, time_limit=5):
+    ## boardClass is the board engine to play on - Board, or the faster BitBoard which has the same interface
+    def __init__(self, p1Strat, p2Strat, root=None, file=None, time_limit=5, boardClass=Board):
 
-        self.board = Board(file)
+        self.boardClass = boardClass
+        self.board = boardClass(file)
 
         self.p1Strat, self.p2Strat = p1Strat, p2Strat
 
@@ -51,6 +54,7 @@ class GameManager():
             firstString = self.board.next_player
         else:
             self.board.next_player = firstString
+        start = self.board.snapshot()
 
         if self.displayingGUI:
             self.gui.update()
@@ -92,6 +96,10 @@ class GameManager():
             self.gui.update()
 
         self.board.save_board("recent.txt")
+
+        # keep a record of every finished game
+        with GameRecordWriter("games.uttt") as writer:
+            writer.append(record_board(self.board, start))
         
             
     ## start the ai processing to make a move
@@ -107,7 +115,7 @@ class GameManager():
 
     def reset(self):
         
-        self.board = Board()
+        self.board = self.boardClass()
         if self.displayingGUI:
             self.gui.reset_board(self.board)
         
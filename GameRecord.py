@@ -0,0 +1,157 @@
+## Ultimate Tic Tac Toe project - a compact binary format for recorded games
+## a game is stored as its start position and one byte per move (the move index 27*x + 9*y + 3*i + j, from 0 to 80), with the search's
+## visit distribution over the 81 moves for each move if it was kept, and the result
+## records are appended to a games file, and an index file alongside it (the games file's name + ".idx") holds the offset of each record for random access
+
+import os
+import struct
+import numpy as np
+
+from Playout import ONGOING, X_WIN, O_WIN, DRAW
+
+## record layout, little endian:
+##   flags (1 byte) - HAS_START if the game didn't start from the empty board with X to move, HAS_VISITS if the visit distributions were kept
+##   result (1 byte) - a result code from Playout (ONGOING if the game was unfinished)
+##   number of moves (1 byte)
+##   if HAS_START, the start position as in Board.snapshot: X's 9 masks and O's 9 masks (2 bytes each), the next player (0 for X, 1 for O)
+##   and the index of the forced local board (1 signed byte, -1 for none)
+##   the moves (1 byte each)
+##   if HAS_VISITS, 81 float16 visit proportions per move in the order of Board.flatten
+HAS_START, HAS_VISITS = 1, 2
+HEADER = struct.Struct("<BBB")
+START = struct.Struct("<18HBb")
+OFFSET = np.dtype("<i8")
+
+## the snapshot of the empty board with X to move, which every record without a start position starts from
+EMPTY_SNAPSHOT = ((0,)*9, (0,)*9, "X", -1)
+
+## the result codes of the game state strings in Board.stateDict
+RESULT_CODES = {"E": ONGOING, "X": X_WIN, "O": O_WIN, "D": DRAW}
+RESULT_STATES = {code: state for state, code in RESULT_CODES.items()}
+
+
+## the index of move (x,y,i,j), and the move of an index
+def move_index(move):
+    x,y,i,j = move
+    return 27*x + 9*y + 3*i + j
+
+def index_move(index):
+    return (index // 27, index // 9 % 3, index // 3 % 3, index % 3)
+
+
+## one recorded game - the start position as a snapshot, the moves as bytes of move indexes, the result as a state string ("X", "O", "D", or "E"
+## if the game was unfinished) and the visit distributions as a (moves, 81) float16 array or None
+class GameRecord():
+
+    def __init__(self, moves=b"", result="E", start=None, visits=None):
+        if start == None:
+            start = EMPTY_SNAPSHOT
+        self.start = start
+        self.moves = bytes(moves)
+        self.result = result
+        self.visits = None
+        if visits is not None:
+            self.visits = np.asarray(visits, dtype=np.float16).reshape(len(self.moves), 81)
+
+    ## the number of moves (plies) in the game
+    def __len__(self):
+        return len(self.moves)
+
+    ## the moves as (x,y,i,j) tuples
+    def move_list(self):
+        return [index_move(index) for index in self.moves]
+
+    ## the record as bytes
+    def encode(self):
+        flags = 0
+        parts = []
+        if self.start != EMPTY_SNAPSHOT:
+            flags |= HAS_START
+            xBits, oBits, player, grid = self.start
+            parts.append(START.pack(*xBits, *oBits, 0 if player == "X" else 1, grid))
+        parts.append(self.moves)
+        if self.visits is not None:
+            flags |= HAS_VISITS
+            parts.append(self.visits.astype("<f2").tobytes())
+        return HEADER.pack(flags, RESULT_CODES[self.result], len(self.moves)) + b"".join(parts)
+
+    def __repr__(self):
+        return "GameRecord || Moves {} || Result {} || Start {} || Visits {}".format(len(self), self.result, self.start != EMPTY_SNAPSHOT, self.visits is not None)
+
+## read a record from a buffer (bytes, or a memory map) at offset, returning the record and the offset just after it
+def decode_record(buffer, offset=0):
+    flags, result, count = HEADER.unpack_from(buffer, offset)
+    offset += HEADER.size
+    start = None
+    if flags & HAS_START:
+        values = START.unpack_from(buffer, offset)
+        start = (values[:9], values[9:18], "X" if values[18] == 0 else "O", values[19])
+        offset += START.size
+    moves = bytes(buffer[offset:offset + count])
+    offset += count
+    visits = None
+    if flags & HAS_VISITS:
+        visits = np.frombuffer(buffer, dtype="<f2", count=81 * count, offset=offset).reshape(count, 81)
+        offset += 2 * 81 * count
+    return GameRecord(moves, RESULT_STATES[result], start, visits), offset
+
+## the record of the game played on a board, from its move history - start is the snapshot of the position the history begins from
+## (the empty board if it is None), and visits the visit distribution of each move if they were kept
+def record_board(board, start=None, visits=None):
+    moves = bytes(move_index(memento.pos) for memento in board.moves)
+    return GameRecord(moves, board.game_state(), start, visits)
+
+
+## appends records to a games file and its index
+class GameRecordWriter():
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "ab")
+        self.indexFile = open(path + ".idx", "ab")
+
+    ## append a record, returning its number in the file
+    def append(self, record):
+        offset = self.file.tell()
+        self.file.write(record.encode())
+        self.indexFile.write(np.array([offset], dtype=OFFSET).tobytes())
+        return self.indexFile.tell() // OFFSET.itemsize - 1
+
+    ## write the appended records out to disk - a record is only visible to a reader opened after it is flushed
+    def flush(self):
+        self.file.flush()
+        self.indexFile.flush()
+
+    def close(self):
+        self.file.close()
+        self.indexFile.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+## random access to the records of a games file, which is memory mapped so that only the records read are loaded
+## the reader sees the records that had been flushed when it was opened
+class GameRecordReader():
+
+    def __init__(self, path):
+        self.path = path
+        self.offsets = np.fromfile(path + ".idx", dtype=OFFSET)
+        self.data = b""
+        if os.path.getsize(path) > 0:
+            self.data = np.memmap(path, dtype=np.uint8, mode="r")
+
+    def __len__(self):
+        return len(self.offsets)
+
+    ## the n-th record in the file
+    def __getitem__(self, n):
+        record, end = decode_record(self.data, int(self.offsets[n]))
+        return record
+
+    def __iter__(self):
+        for n in range(len(self)):
+            yield self[n]
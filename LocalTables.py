@@ -0,0 +1,84 @@
+## Ultimate Tic Tac Toe project - precomputed facts about the 3x3 local boards
+## so that the state of a local board (or of the global board, which is a 3x3 grid of local boards) is a table lookup rather than a calculation
+
+## squares (i,j) of a local board are numbered c = 3*i + j
+## a configuration is indexed either by 9 bit masks over the squares, or by its base-3 key: the sum over the squares of 3**c times
+## 0 for an empty square, 1 for X and 2 for O (for the global board, 1 or 2 for a local board won by X or O)
+
+FULL = 0b111111111
+
+## the 8 winning lines of a 3x3 grid, as bitmasks over the squares 3*i + j
+WIN_MASKS = (0b000000111, 0b000111000, 0b111000000,   # horizontals
+             0b001001001, 0b010010010, 0b100100100,   # verticals
+             0b100010001, 0b001010100)                # diagonals
+
+## WINNING[mask] is True if the squares in mask contain a complete line
+WINNING = tuple(any(mask & line == line for line in WIN_MASKS) for mask in range(FULL + 1))
+
+## COUNTS[mask] is the number of squares in a 9 bit mask
+COUNTS = tuple(bin(mask).count("1") for mask in range(FULL + 1))
+
+## MOVES[k][empty] is the tuple of moves (x,y,i,j) available in local board k = 3*x + y, given the bitmask of its empty squares
+## the tuples are shared and read-only, so they can be handed out as the legal moves without copying them
+MOVES = tuple(tuple(tuple((k // 3, k % 3, c // 3, c % 3) for c in range(9) if empty >> c & 1) for empty in range(FULL + 1)) for k in range(9))
+
+## PLAYABLE[done] is the tuple of local boards k that are not in the 9 bit mask of done boards
+PLAYABLE = tuple(tuple(k for k in range(9) if not done >> k & 1) for done in range(FULL + 1))
+
+
+## base-3 keys
+KEYS = 3 ** 9
+POWERS = tuple(3 ** c for c in range(9))
+
+## TRITS[mask] is the base-3 key of a configuration with a 1 in each square of mask, so the key of X's pieces x and O's pieces o is TRITS[x] + 2*TRITS[o]
+TRITS = tuple(sum(POWERS[c] for c in range(9) if mask >> c & 1) for mask in range(FULL + 1))
+
+## the value added to a key by a piece of each player
+PIECE_TRIT = {"X": 1, "O": 2}
+
+## X_MASK[key] and O_MASK[key] are the squares holding X and O in a configuration
+X_MASK = [0] * KEYS
+O_MASK = [0] * KEYS
+for key in range(KEYS):
+    for c in range(9):
+        trit = key // POWERS[c] % 3
+        if trit == 1:
+            X_MASK[key] |= 1 << c
+        elif trit == 2:
+            O_MASK[key] |= 1 << c
+X_MASK = tuple(X_MASK)
+O_MASK = tuple(O_MASK)
+
+## EMPTY[key] is the mask of the empty squares of a configuration
+EMPTY = tuple(FULL ^ (X_MASK[key] | O_MASK[key]) for key in range(KEYS))
+
+## STATE[key] is the state of a configuration as a local board, in the strings of Board.stateDict: "X" or "O" if won (X first, as
+## Board.calculate_local_game_state checks), "F" if full and not won, and "E" if still in play
+def configuration_state(key):
+    if WINNING[X_MASK[key]]:
+        return "X"
+    if WINNING[O_MASK[key]]:
+        return "O"
+    if EMPTY[key] == 0:
+        return "F"
+    return "E"
+
+STATE = tuple(configuration_state(key) for key in range(KEYS))
+
+## DEAD[key] is True if neither player can complete a line - every line holds both an X and an O
+DEAD = tuple(all(X_MASK[key] & line and O_MASK[key] & line for line in WIN_MASKS) for key in range(KEYS))
+
+## OPEN_LINE[mask] is True if some line has no square in mask, so a player can still complete a line in a local board if OPEN_LINE[the opponent's pieces]
+OPEN_LINE = tuple(any(not mask & line for line in WIN_MASKS) for mask in range(FULL + 1))
+
+## X_WINNABLE[key] is True if X has won the local board or could still win it (it is in play and some line has no O in it), and O_WINNABLE[key] the same for O
+## a player can still win the game only if their winnable local boards contain a line of the global board
+X_WINNABLE = tuple(STATE[key] == "X" or (STATE[key] == "E" and OPEN_LINE[O_MASK[key]]) for key in range(KEYS))
+O_WINNABLE = tuple(STATE[key] == "O" or (STATE[key] == "E" and OPEN_LINE[X_MASK[key]]) for key in range(KEYS))
+
+## the number of a player's pieces in each line of a 3x3 grid, in the layout of Board's line caches:
+## [[rows i = 0, 1, 2], [columns j = 0, 1, 2], [diagonal i == j, diagonal i + j == 2]]
+def line_counts(mask):
+    return [[COUNTS[mask & WIN_MASKS[line]] for line in range(3)],
+            [COUNTS[mask & WIN_MASKS[line]] for line in range(3, 6)],
+            [COUNTS[mask & WIN_MASKS[line]] for line in range(6, 8)]]
@@ -1,23 +1,27 @@
 import random
 import time
-import math
+import numpy as np
 from Strat import Strat
+import Selection
+import Playout
 
 
 
 ## pure monte-carlo tree search, using a random playout as the simulation step
 ## Leaf node: any node with a child from which no simulation has taken place
+## with playoutsPerLeaf > 1, each simulation runs that many playouts from the leaf in one call and backpropagates their total at once
 class MCTS(Strat):
 
-    def __init__(self, board, update_foo=None):
-        board = board.copy()
+    def __init__(self, board, update_foo=None, playoutsPerLeaf=1):
+        board = board.search_copy()
         Strat.__init__(self, board, update_foo)
         self.tree = Tree(board)
+        self.playoutsPerLeaf = playoutsPerLeaf
 
     ## function to update the search tree to have a new root node
     def update_tree(self, newRoot, board):
         #board = copy.deepcopy(board)
-        board = board.copy()
+        board = board.search_copy()
         self.tree = Tree(board)
         self.tree.root = newRoot
         self.tree.root.parent = None
@@ -46,7 +50,7 @@ class MCTS(Strat):
 
         self.update_tree_nodeless(board, oppMove)
 
-        boardCopy = board.copy()
+        boardCopy = board.search_copy()
         
         ## for the allotted search time, build up information about the search tree
         count = 0
@@ -67,43 +71,30 @@ class MCTS(Strat):
 
         # update the root of the tree to the best move node
         #self.update_tree(bestMoveNode, copy.deepcopy(board))
-        self.update_tree(bestMoveNode, board.copy())
+        self.update_tree(bestMoveNode, board.search_copy())
 
         print("Count is: {}".format(count), "Total moves is: {}".format(board.totalMoves))
         
         
         
     ## select a leaf node to explore the game tree from
+    ## all the children of a node are scored at once, and ties are broken at random
     def selection(self, board, root):
         node = root
         counter = 0
         while not node.is_leaf():
-            lastNode = node
-            maximumScore = 0
-            bestNodes = []
-            for child in node.children:
-                score = self.select_express(child, node)
-                if score > maximumScore:
-                    bestNodes = [child]
-                    maximumScore = score
-                elif score == maximumScore:
-                    bestNodes.append(child)
-                
-            node = random.choice(bestNodes)
+            children = node.children
+            wi = np.fromiter((child.num for child in children), np.float64, len(children))
+            ni = np.fromiter((child.den for child in children), np.float64, len(children))
+            node = children[Selection.random_argmax(self.select_express(wi, ni, node.den))]
             x,y,i,j = node.move
             board.make_move(x,y,i,j)
             counter += 1
         return board, node, counter
 
-    def select_express(self, child, parent):
-        wi = child.num
-        ni = float(child.den)
-        Ni = parent.den
-        c = 1.4142
-        if ni == 0:
-            return float("inf")
-        else:
-            return wi/ni + c * ((math.log(Ni)/ ni) ** 0.5)  ## or different expression in neural net version
+    ## the scores of a node's children, given arrays of their numerators and denominators and the parent's denominator
+    def select_express(self, wi, ni, Ni):
+        return Selection.ucb_scores(wi, ni, Ni)  ## or different expression in neural net version
 
     ## expand the game tree from a leaf node, and select a child node to conduct a simulation from
     def expansion(self, board, parent):
@@ -122,22 +113,20 @@ class MCTS(Strat):
             return parent
         
     # simulate one playout from a node, and backpropagate the information this gives along the game tree
+    ## the random playout is run by Playout.random_playout on a snapshot of the board (in compiled code if _playout has been built)
     def simulation(self, board, node):
         node.do_simulate_update()
-        counter = 0
-        while board.game_state() == board.stateDict["ongoing"]:
-            moves = board.get_valid_moves()
-##            if board.totalMoves > 35:
-##                move = max((move for move in moves), key = lambda x: self.simulate_heuristic(x, board))
-##            else:
-            move = random.choice(moves)
-            
-            
-            counter += 1
-            x,y,i,j = move
-            board.make_move(x,y,i,j)
-    
-        state = board.game_state()
+
+        if self.playoutsPerLeaf > 1:
+            xWins, oWins, draws = Playout.random_playouts(board.snapshot(), self.playoutsPerLeaf)
+            if node.player == board.xstr:
+                score = xWins + 0.5 * draws
+            else:
+                score = oWins + 0.5 * draws
+            self.back_propagate(node, score, board, self.playoutsPerLeaf)
+            return
+
+        state = Playout.random_playout(board.snapshot())
         #print("simulation result is " + state)
         if state == board.stateDict["X win"]:
             if node.player == board.xstr:
@@ -156,9 +145,6 @@ class MCTS(Strat):
         self.back_propagate(node, score, board)
         #print(self.tree)
 
-        for a in range(counter):
-            board.un_make_move()
-
     # 
     def simulate_heuristic(self, move, board):
         #return random.random()
@@ -194,16 +180,24 @@ class MCTS(Strat):
         return score
 
     ## back propagate the result of a simulation along the game tree
-    def back_propagate(self, node, score, board):
+    ## score is the total over count playouts, so each node gains count visits and the other player's total is count - score
+    def back_propagate(self, node, score, board, count=1):
         while node.parent != None:
-            node.den += 1
+            node.den += count
             node.num += score
-            score = 1 - score
+            score = count - score
             node = node.parent
         
-        node.den += 1
+        node.den += count
         node.num += score
 
+    ## count loss visits along the path from node to the root, while the node's result is outstanding
+    ## no wins are added, so each node looks worse to the player choosing it and other searches are steered elsewhere
+    def add_virtual_loss(self, node, loss):
+        while node != None:
+            node.den += loss
+            node = node.parent
+
     ## select the best move for the current player to make, given the current state of the game tree - the node with greatest denominator
     def choose_best_move(self):
         children = self.tree.root.children
@@ -220,6 +214,10 @@ class MCTS(Strat):
 
         return random.choice(bestMoves)
 
+    ## the (move, num, den) statistics of each child of the root, for combining the results of several searches
+    def root_visits(self, board):
+        return [(child.move, child.num, child.den) for child in self.tree.root.children]
+
     def consider_moves(self, boardCopy):
 
         #print(self.tree.root)
@@ -282,6 +280,12 @@ class Node():
         self.player = player
         self.posScore = None
         self.policy = None
+        self.proven = None # the score for self.player (1, 0.5 or 0) once the node's result is known for certain, used by MCTS_Solver
+
+        ## all-moves-as-first statistics indexed by move slot, and the move slot of each child, once the node is expanded - used by MCTS_RAVE
+        self.amafNum = None
+        self.amafDen = None
+        self.slots = None
 
         ## variables for checking whether a node is a leaf or not, and for knowing when to create new child nodes from it
         self.childMoveCount = 0
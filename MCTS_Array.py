@@ -0,0 +1,252 @@
+import random
+import time
+import numpy as np
+
+from MCTS import MCTS
+import Selection
+import Playout
+
+
+## the moves (x,y,i,j) for each move index 27*x + 9*y + 3*i + j (the order of Board.flatten)
+MOVE_TUPLES = tuple((a // 27, a // 9 % 3, a // 3 % 3, a % 3) for a in range(81))
+
+def move_index(move):
+    x,y,i,j = move
+    return 27*x + 9*y + 3*i + j
+
+## players are stored as 0 for X and 1 for O
+PLAYERS = ("X", "O")
+
+
+## pure monte-carlo tree search, using a random playout as the simulation step, with the tree stored as arrays (see ArrayTree)
+## Leaf node: any node with a child from which no simulation has taken place
+class MCTS_Array(MCTS):
+
+    def __init__(self, board, update_foo=None, capacity=4096):
+        MCTS.__init__(self, board, update_foo)
+        self.capacity = capacity
+        self.tree = ArrayTree(board.player_just_played(), capacity)
+
+    ## function to update the search tree to have a new root node (a node id in the current tree)
+    def update_tree(self, newRoot, board):
+        self.tree = self.tree.subtree(newRoot)
+
+    ## update the search tree to have a new root node, given the last move
+    def update_tree_nodeless(self, board, oppMove):
+        oppNode = None
+        if oppMove != None:
+            oppNode = self.tree.find_child(self.tree.root, move_index(oppMove))
+        if oppNode != None:
+            self.update_tree(oppNode, board)
+        else:
+            self.tree = ArrayTree(board.player_just_played(), self.capacity)
+
+    ## make and implement a move using the MCTS strategy
+    def move(self, board, endTime, aiString="X", oppMove=None):
+
+        self.update_tree_nodeless(board, oppMove)
+
+        boardCopy = board.search_copy()
+
+        ## for the allotted search time, build up information about the search tree
+        count = 0
+        while time.time() < endTime:
+
+            self.consider_moves(boardCopy)
+
+            # update the gui, if applicable
+            self.update_root()
+            count += 1
+
+        ## get the node corresponding to the best move (move with the most playouts)
+        bestMoveNode = self.choose_best_move()
+        x,y,i,j = MOVE_TUPLES[self.tree.move[bestMoveNode]]
+
+        board.make_move(x,y,i,j)
+
+        # update the root of the tree to the best move node
+        self.update_tree(bestMoveNode, board)
+
+        print("Count is: {}".format(count), "Total moves is: {}".format(board.totalMoves), "Tree size is: {}".format(self.tree.size))
+
+    ## select a leaf node to explore the game tree from
+    ## all the children of a node are scored at once from slices of the tree's arrays
+    def selection(self, board, root):
+        tree = self.tree
+        node = root
+        counter = 0
+        while not tree.is_leaf(node):
+            first = int(tree.firstChild[node])
+            last = first + int(tree.childCount[node])
+            node = first + Selection.random_argmax(self.select_express(tree.num[first:last], tree.den[first:last], tree.den[node]))
+            x,y,i,j = MOVE_TUPLES[tree.move[node]]
+            board.make_move(x,y,i,j)
+            counter += 1
+        return board, node, counter
+
+    ## expand the game tree from a leaf node, and select a child node that hasn't been simulated from yet
+    def expansion(self, board, parent):
+        tree = self.tree
+        state = board.game_state()
+        if state == board.stateDict["ongoing"]:
+            if tree.childCount[parent] == 0:
+                tree.add_children(parent, [move_index(move) for move in board.get_valid_moves()])
+            first = tree.firstChild[parent]
+            unvisited = np.flatnonzero(tree.den[first:first + tree.childCount[parent]] == 0)
+            return first + int(random.choice(unvisited))
+        else:
+            return parent
+
+    # simulate one playout from a node, and backpropagate the information this gives along the game tree
+    def simulation(self, board, node):
+        tree = self.tree
+        if tree.den[node] == 0 and node != tree.root:
+            tree.simulatedChildren[tree.parent[node]] += 1
+
+        state = Playout.random_playout(board.snapshot())
+        player = PLAYERS[tree.player[node]]
+        if state == board.stateDict["X win"]:
+            score = 1 if player == board.xstr else 0
+        elif state == board.stateDict["O win"]:
+            score = 1 if player == board.ostr else 0
+        else:
+            score = 0.5
+
+        self.back_propagate(node, score, board)
+
+    ## back propagate the result of a simulation along the game tree
+    def back_propagate(self, node, score, board):
+        tree = self.tree
+        while node != -1:
+            tree.den[node] += 1
+            tree.num[node] += score
+            score = 1 - score
+            node = int(tree.parent[node])
+
+    ## select the best move for the current player to make - the child of the root with greatest denominator
+    def choose_best_move(self):
+        tree = self.tree
+        first = tree.firstChild[tree.root]
+        dens = tree.den[first:first + tree.childCount[tree.root]]
+        return first + Selection.random_argmax(dens)
+
+    ## the (move, num, den) statistics of each child of the root, for combining the results of several searches
+    def root_visits(self, board):
+        tree = self.tree
+        first = int(tree.firstChild[tree.root])
+        return [(MOVE_TUPLES[tree.move[a]], float(tree.num[a]), float(tree.den[a])) for a in range(first, first + int(tree.childCount[tree.root]))]
+
+    def consider_moves(self, boardCopy):
+
+        boardCopy, leaf, moveCounter = self.selection(boardCopy, self.tree.root)
+
+        child = self.expansion(boardCopy, leaf)
+        if child != leaf:
+            x,y,i,j = MOVE_TUPLES[self.tree.move[child]]
+            boardCopy.make_move(x,y,i,j)
+            moveCounter += 1
+
+        self.simulation(boardCopy, child)
+
+        for a in range(moveCounter):
+            boardCopy.un_make_move()
+
+        return boardCopy
+
+
+## a search tree stored as a structure of arrays, indexed by node id
+## the children of a node are allocated together, so they are the contiguous block firstChild[node] : firstChild[node] + childCount[node]
+## the arrays are preallocated and double in size when they run out of room
+class ArrayTree():
+
+    def __init__(self, rootPlayer, capacity=4096):
+        self.size = 0
+        self.allocate(capacity)
+        self.root = self.new_nodes(1)
+        self.parent[self.root] = -1
+        self.player[self.root] = PLAYERS.index(rootPlayer)
+
+    def allocate(self, capacity):
+        self.capacity = capacity
+        self.num = np.zeros(capacity, dtype=np.float64)
+        self.den = np.zeros(capacity, dtype=np.float64)
+        self.parent = np.zeros(capacity, dtype=np.int32)
+        self.firstChild = np.zeros(capacity, dtype=np.int32)
+        self.childCount = np.zeros(capacity, dtype=np.int8)
+        self.simulatedChildren = np.zeros(capacity, dtype=np.int8) # how many children have been simulated from - the node is a leaf until all have
+        self.move = np.zeros(capacity, dtype=np.int8) # the move index (27*x + 9*y + 3*i + j) leading to the node
+        self.player = np.zeros(capacity, dtype=np.int8) # the player who made that move
+
+    ## double the size of every array until count more nodes fit
+    def grow(self, count):
+        capacity = self.capacity
+        while self.size + count > capacity:
+            capacity *= 2
+        if capacity != self.capacity:
+            for name in ("num", "den", "parent", "firstChild", "childCount", "simulatedChildren", "move", "player"):
+                old = getattr(self, name)
+                new = np.zeros(capacity, dtype=old.dtype)
+                new[:self.size] = old[:self.size]
+                setattr(self, name, new)
+            self.capacity = capacity
+
+    ## reserve count new nodes and return the id of the first
+    def new_nodes(self, count):
+        self.grow(count)
+        first = self.size
+        self.size += count
+        return first
+
+    ## add a child for each move index in moves, as one block
+    def add_children(self, node, moves):
+        count = len(moves)
+        first = self.new_nodes(count)
+        last = first + count
+        self.parent[first:last] = node
+        self.move[first:last] = moves
+        self.player[first:last] = 1 - self.player[node]
+        self.firstChild[node] = first
+        self.childCount[node] = count
+
+    ## find the child of node reached by a move index, or None
+    def find_child(self, node, move):
+        first = self.firstChild[node]
+        matches = np.flatnonzero(self.move[first:first + self.childCount[node]] == move)
+        if len(matches) == 0:
+            return None
+        return first + int(matches[0])
+
+    ## leaf nodes have a potential child node that hasn't been simulated from yet
+    def is_leaf(self, node):
+        count = self.childCount[node]
+        return count == 0 or self.simulatedChildren[node] < count
+
+    ## make a new tree holding just the subtree under node, which becomes the root
+    ## blocks of children are copied whole, so this costs one step per expanded node rather than per node
+    def subtree(self, node):
+        tree = ArrayTree.__new__(ArrayTree)
+        tree.size = 0
+        tree.allocate(self.capacity)
+        tree.root = tree.new_nodes(1)
+        for name in ("num", "den", "childCount", "simulatedChildren", "move", "player"):
+            getattr(tree, name)[tree.root] = getattr(self, name)[node]
+        tree.parent[tree.root] = -1
+
+        pending = [(node, tree.root)]
+        while pending:
+            old, new = pending.pop()
+            count = int(self.childCount[old])
+            if count == 0:
+                continue
+            first = int(self.firstChild[old])
+            newFirst = tree.new_nodes(count)
+            for name in ("num", "den", "childCount", "simulatedChildren", "move", "player"):
+                getattr(tree, name)[newFirst:newFirst + count] = getattr(self, name)[first:first + count]
+            tree.parent[newFirst:newFirst + count] = new
+            tree.firstChild[new] = newFirst
+            for a in np.flatnonzero(self.childCount[first:first + count]):
+                pending.append((first + int(a), newFirst + int(a)))
+        return tree
+
+    def __repr__(self):
+        return "ArrayTree of {} nodes || Root ratio {} / {}".format(self.size, self.num[self.root], self.den[self.root])
@@ -1,85 +1,198 @@
-import random
-import time
-import math
-from Strat import Strat
 import numpy as np
+import Selection
+import Symmetry
 
-from MCTS import MCTS, Tree, Node
-from Board import Board
+from MCTS import MCTS
+from Evaluator import BatchEvaluator
 
 
-## pure monte-carlo tree search, using a random playout as the simulation step
+## monte-carlo tree search guided by a neural net: each new node is evaluated once by the net, giving its prior over moves and its score
 ## Leaf node: any node with a child from which no simulation has taken place
+## with batchSize > 1, each call of consider_moves selects batchSize leaves (using virtual loss to spread them out) and evaluates them in one batch
+## by evaluator, an Evaluator.BatchEvaluator shared with other searches (e.g. Evaluator.shared_evaluator(neuralNet)), or otherwise one of its own
+## cache is an optional Evaluator.EvaluationCache (e.g. Evaluator.shared_cache(neuralNet)) so positions already seen aren't sent to the net again
+## the cache is keyed by the canonical key of the position (Board.canonical) with the policy in the canonical position's frame, so symmetric positions share an entry
 class MCTS_ML(MCTS):
 
-    def __init__(self, board, neuralNet, update_foo=None):
+    def __init__(self, board, neuralNet, update_foo=None, batchSize=1, maxWait=0.005, cache=None, evaluator=None):
         MCTS.__init__(self, board, update_foo)
         self.neuralNet = neuralNet
+        self.cache = cache
+        self.inputBuffer = np.empty((1,9,9)) # the net's input for a single position, reused for every evaluation
+        self.batchSize = batchSize
+        self.evaluator = None
+        self.ownsEvaluator = False
+        if batchSize > 1:
+            self.evaluator = evaluator
+            if evaluator == None:
+                self.evaluator = BatchEvaluator(neuralNet, batchSize, maxWait)
+                self.ownsEvaluator = True
 
     def policy_empty(self, policy):
         return type(policy) == type(None)
 
+    ## the net's (policy, value) for the board's position, from the cache if the position or a symmetric one has been evaluated before
+    def evaluate(self, board):
+        if self.cache != None:
+            key, transform = board.canonical()
+            cached = self.cached_evaluation(key, transform)
+            if cached != None:
+                return cached
+        board.export(self.inputBuffer[0])
+        prediction = self.neuralNet.predict(self.inputBuffer)
+        policy, value = prediction[0][0], prediction[1][0][0]
+        if self.cache != None:
+            self.cache_evaluation(key, transform, policy, value)
+        return policy, value
+
+    ## the cached (policy, value) for a canonical key, with the policy moved back from the canonical frame by the position's transform, or None
+    def cached_evaluation(self, key, transform):
+        cached = self.cache.get(key)
+        if cached == None:
+            return None
+        policy, value = cached
+        return Symmetry.transform_policy(np.reshape(policy, (81,)), Symmetry.INVERSE[transform]), value
+
+    ## cache a position's (policy, value) under its canonical key, with the policy moved into the canonical frame
+    def cache_evaluation(self, key, transform, policy, value):
+        self.cache.put(key, Symmetry.transform_policy(np.reshape(policy, (81,)), transform), value)
+
+    ## turn the net's output for a position into a node's prior and score, given the position's legal moves
+    ## the prior is the policy masked to the legal moves and renormalised, as a flat (81,) array indexed by 27*x + 9*y + 3*i + j
+    ## the value is for the player to move (as in board.export), so the score for the player who just moved is (1 - value) / 2
+    def node_evaluation(self, moves, policy, value):
+        legal = [27*x + 9*y + 3*i + j for x,y,i,j in moves]
+        prior = np.zeros(81)
+        prior[legal] = np.reshape(policy, (81,))[legal]
+        total = prior.sum()
+        if total > 0:
+            prior /= total
+        elif len(legal) > 0:
+            prior[legal] = 1.0 / len(legal)
+        return prior, (1 - value) / 2
+
+    ## the score of a finished game for the player who just moved, or None if the game is still in play
+    def terminal_score(self, board):
+        state = board.game_state()
+        if state == board.stateDict["ongoing"]:
+            return None
+        if state == board.stateDict["draw"]:
+            return 0.5
+        if state == board.player_just_played():
+            return 1
+        return 0
+
     ## select a leaf node to explore the game tree from
+    ## all the children of a node are scored at once, and ties are broken at random
+    ## each node's prior is stored when it is evaluated, so only a root that hasn't been evaluated yet needs the net here
     def selection(self, board, root):
         node = root
         counter = 0
         while not node.is_leaf():
-            lastNode = node
-            maximumScore = 0
-            bestNodes = []
             if self.policy_empty(node.policy):
-                node.policy = Board.unflatten(self.neuralNet.predict(board.export().reshape(1,9,9))[0])
+                policy, value = self.evaluate(board)
+                node.policy = self.node_evaluation(board.get_valid_moves(), policy, value)[0]
             policy = node.policy
-            
-            for child in node.children:
-                x,y,i,j = child.move
-                prob = policy[x,y,i,j]   # causing errors with policy not being the correct shape
-                score = self.select_express(child, node, prob)
-                if score > maximumScore:
-                    bestNodes = [child]
-                    maximumScore = score
-                elif score == maximumScore:
-                    bestNodes.append(child)
-                
-            node = random.choice(bestNodes)
+
+            children = node.children
+            wi = np.fromiter((child.num for child in children), np.float64, len(children))
+            ni = np.fromiter((child.den for child in children), np.float64, len(children))
+            prior = policy[[27*x + 9*y + 3*i + j for x,y,i,j in (child.move for child in children)]]
+            node = children[Selection.random_argmax(self.select_express(wi, ni, node.den, prior))]
             x,y,i,j = node.move
             board.make_move(x,y,i,j)
             counter += 1
         return board, node, counter
 
-    def select_express(self, child, parent, prob):
-        wi = child.num
-        ni = float(child.den)
-        Ni = parent.den
-        c = 1.4142
-        if ni == 0:
-            return float("inf")
-        else:                           
-            return wi/ni + c * prob * ((Ni)**0.5) / (1+ni)
-
-        
-    # simulate one playout from a node, and backpropagate the information this gives along the game tree
+    ## the PUCT scores of a node's children, given arrays of their statistics and of the network's prior for each of them
+    def select_express(self, wi, ni, Ni, prior):
+        return Selection.puct_scores(wi, ni, Ni, prior)
+
+    # evaluate a node (the board must be at the node's position) with one pass of the net, which gives both its prior and its score,
+    # and backpropagate the score along the game tree
     def simulation(self, board, node):
         node.do_simulate_update()
-    
-        prediction = self.neuralNet.predict(board.export().reshape(1,9,9))
-
-        score = prediction[1][0][0]
-        policy = prediction[0]
-        if self.policy_empty(node.policy):
-            node.policy = policy
-        #print(self.tree)
+
+        score = self.terminal_score(board)
+        if score == None:
+            policy, value = self.evaluate(board)
+            node.policy, score = self.node_evaluation(board.get_valid_moves(), policy, value)
+
         self.back_propagate(node, score, board)
-        #print(self.tree)
 
+    ## select the next node to evaluate, and move the board to it
+    ## a leaf that hasn't been evaluated yet is evaluated itself, otherwise it is expanded and one of its children is evaluated,
+    ## so every node is evaluated once, when it is first reached
+    def select_node(self, boardCopy):
+        boardCopy, leaf, moveCounter = self.selection(boardCopy, self.tree.root)
+        if leaf.den == 0:
+            return leaf, moveCounter
+        child = self.expansion(boardCopy, leaf)
+        if child != leaf:
+            x,y,i,j = child.move
+            boardCopy.make_move(x,y,i,j)
+            moveCounter += 1
+        return child, moveCounter
+
+    def consider_moves(self, boardCopy):
+        if self.evaluator == None:
+            child, moveCounter = self.select_node(boardCopy)
 
-    ## back propagate the result of a simulation along the game tree
+            self.simulation(boardCopy, child)
+
+            for a in range(moveCounter):
+                boardCopy.un_make_move()
+            return boardCopy
+
+        ## select and expand a batch of leaves, holding a virtual loss on each path until its evaluation is back
+        pending = []
+        for b in range(self.batchSize):
+            child, moveCounter = self.select_node(boardCopy)
+            child.do_simulate_update()
+
+            score = self.terminal_score(boardCopy)
+            if score != None:
+                self.back_propagate(child, score, boardCopy)
+            else:
+                self.add_virtual_loss(child, 1)
+                key, transform = boardCopy.canonical()
+                cached = None
+                if self.cache != None:
+                    cached = self.cached_evaluation(key, transform)
+                evaluation = None
+                if cached == None:
+                    evaluation = self.evaluator.submit(boardCopy.export())
+                pending.append((child, boardCopy.get_valid_moves(), (key, transform), evaluation, cached))
+
+            for a in range(moveCounter):
+                boardCopy.un_make_move()
+
+        for child, moves, (key, transform), evaluation, cached in pending:
+            if cached != None:
+                policy, value = cached
+            else:
+                policy, value = evaluation.result()
+                if self.cache != None:
+                    self.cache_evaluation(key, transform, policy, value)
+            self.add_virtual_loss(child, -1)
+            child.policy, score = self.node_evaluation(moves, policy, value)
+            self.back_propagate(child, score, boardCopy)
+
+        return boardCopy
+
+    ## stop the batch evaluator, if the search has its own
+    def close(self):
+        if self.ownsEvaluator:
+            self.evaluator.close()
+
+
+    ## back propagate the result of a simulation along the game tree (scores are from 0 to 1 for the player who moved into each node)
     def back_propagate(self, node, score, board):
         while node.parent != None:
             node.den += 1
             node.num += score
-            score = 1 - score                                       #      """ may need to be altered in this implementation, if the end scores are not compressed to 1 to 0   """
+            score = 1 - score
             node = node.parent
-        
+
         node.den += 1
         node.num += score
@@ -4,10 +4,12 @@ import tkinter as tk
 
 from GameManager import GameManager
 from Board import Board
-from MCTS_ML import MCTS_ML
+from SelfPlay import SelfPlayPool
+from ReplayBuffer import ReplayBuffer
+from DataLoader import DataLoader
+from GameRecord import GameRecordWriter
 
 import random
-import pandas as pd
 import cProfile
 import numpy as np
 
@@ -32,38 +34,6 @@ def enablePrint():
     sys.stdout = OUTPUT
 
 
-class MCTS_ML_train(MCTS_ML):
-    def __init__(self, board, neuralNet=None):
-        if neuralNet == None:
-            ## make a neural net of the right shape
-            pass
-        
-        MCTS_ML.__init__(self, board, neuralNet)
-
-    ## select moves at weighted randomness for the current player to make, given the current state of the game tree
-    def choose_best_move(self):
-        children = self.tree.root.children
-
-        total = float(self.tree.root.den)
-        weightedProbs = [child.den / total for child in children]
-        bestNode = random.choices(children, weights = weightedProbs)[0]
-        return bestNode
-
-    def return_policy(self):
-        children = self.tree.root.children
-
-        total = float(self.tree.root.den)
-
-        policy = np.zeros((3,3,3,3))
-        for child in children:
-            x,y,i,j = child.move
-            policy[x,y,i,j] += child.den
-
-        policy = policy / total
-        policy = Board.flatten(policy)
-        return policy
-        
-
 def make_net(learningRate):
     input_layer = layers.Input(shape=(9,9), name="BoardInput")
     reshape = layers.core.Reshape((9,9,1))(input_layer)
@@ -85,143 +55,94 @@ def make_net(learningRate):
     return model
 
 
-def train_nn(nn, states, policies, results):
+## train the net on batches from a DataLoader, with steps batches to an epoch
+def train_nn(nn, loader, steps):
 
-    states = np.array(states)
-    policies = np.array(policies)
-    results = np.array(results)
+    print(steps, "batches of", loader.batchSize)
 
-    print(states.shape, policies.shape, results.shape)
-
-    history = nn.fit(states, [policies, results], batch_size=32, epochs=TRAINING_EPOCHS, verbose=0)
+    history = nn.fit(loader, steps_per_epoch=steps, epochs=TRAINING_EPOCHS, verbose=0)
 
     print("loss is", history.history['loss'][-1])
 
-def do_one_move(ai, board):
-    lastMove = board.get_last_move()
-    ai.update_tree_nodeless(board, lastMove)
-    
-    for it in range(MCTS_ITERS):
-        print(it, "/", MCTS_ITERS)
-        ai.consider_moves(board)
-    moveNode = ai.choose_best_move()
-    move = moveNode.move
-    
-    policy = ai.return_policy()
-    state = board.export()
-    
-    ai.update_tree(moveNode, board.copy())
-
-    x,y,i,j  = move
-    board.make_move(x,y,i,j)
-
-    return state, policy
-
-def play_game(net1, net2):
-    b = Board()
-    p1 = MCTS_ML_train(b, net1)
-    p2 = MCTS_ML_train(b, net2)
-
-    stateList = []
-    policyList = []
-    resultList = []
-
-    p1Player = b.xstr
-    while b.game_state() == b.stateDict["ongoing"]:
-        print("move made")
-        if b.next_player == p1Player:
-            ai = p1
-        else:
-            ai = p2
-
-        state, policy = do_one_move(ai, b)
-
-        policyList.append(policy)
-        stateList.append(state)
-
-    # update the result associated with each state-policy pair to reflect the result of the game
-    gameState = b.game_state()
-    if gameState == b.stateDict["X win"]:
-        result = 1
-    elif gameState == b.stateDict["O win"]:
-        result = -1
-    else:
-        result = 0
-
-    for p in policyList:
-        resultList.append(result)
-        result *= -1
+## the spawned self-play workers import this file too, so the training only runs when it is the main script
+if __name__ == "__main__":
 
-    return stateList, policyList, resultList, gameState
+    print("libraries imported")
 
-print("libraries imported")
+    LEARNRATE = 1
+    REPLAY_CAPACITY = 2000000
 
-LEARNRATE = 1
+    input()
 
-input()
+    ## every self-play sample is kept on disk in the replay buffer, which is reopened where it left off if it already exists
+    replay = ReplayBuffer("replay", capacity=REPLAY_CAPACITY)
+    print("replay buffer holds {} samples".format(len(replay)))
 
-path = "data.csv"
-cols = ["board", "policy", "end state"]
+    # every self-play game is also kept as a GameRecord, with its visit distributions
+    gameRecords = GameRecordWriter("selfplay.uttt")
 
-try:
-    data = pd.read_csv(path, index_col = 0)
-except FileNotFoundError:
-    print("creating new file")
-    data = pd.DataFrame(columns = cols)
 
-    data.to_csv(path)
 
+    EPOCHS = 100
+    GAMES_PER_EPOCH = 5
+    MCTS_ITERS = 400
+    TRAINING_EPOCHS = 100
+    WORKERS = os.cpu_count() or 1
+    TRAINING_SAMPLES = 4096
+    BATCH_SIZE = 32
+    SAMPLE_HALF_LIFE = 50000 # samples become half as likely to be trained on for every SAMPLE_HALF_LIFE newer ones
 
 
-EPOCHS = 100
-GAMES_PER_EPOCH = 5
-MCTS_ITERS = 400
-TRAINING_EPOCHS = 100
+    net = make_net(LEARNRATE)
+    net.summary()
 
+    board = Board()
+    import time
+    s = time.time()
+    for i in range(100):
+        net.predict(board.export().reshape(1,9,9))
 
-net = make_net(LEARNRATE)
-net.summary()
+    t = time.time()
+    print((t-s) / 100)
 
-board = Board()
-import time
-s = time.time()
-for i in range(100):
-    net.predict(board.export().reshape(1,9,9))
+    ## the self-play games are played by worker processes, each loading the weights from temp.h5
+    selfPlay = SelfPlayPool('temp.h5', workers=WORKERS, iterations=MCTS_ITERS)
 
-t = time.time()
-print((t-s) / 100)
+    loader = None
 
-for epoch in range(EPOCHS):
+    for epoch in range(EPOCHS):
 
-    print("Epoch {}".format(epoch + 1))
+        print("Epoch {}".format(epoch + 1))
 
-    net.save('temp.h5')
-    oldNet = models.load_model('temp.h5')
+        ## the workers pick up the new weights for their next games
+        selfPlay.publish(net)
 
-    states = []
-    policies = []
-    results = []
+        for game, (stateList, policyList, resultList, gameState, record, version) in enumerate(selfPlay.games(GAMES_PER_EPOCH)):
+            print("Game {} / {} (weights version {})".format(game+1, GAMES_PER_EPOCH, version))
 
-    for game in range(GAMES_PER_EPOCH):
-        print("Game {} / {}".format(game+1, GAMES_PER_EPOCH))
-        stateList, policyList, resultList, gameState = play_game(net, net)
-        
+            replay.add(stateList, policyList, resultList)
+            gameRecords.append(record)
+        replay.flush()
+        gameRecords.flush()
 
-        states += stateList
-        results += resultList
-        policies += policyList
+        ## the training batches are drawn from the replay buffer and put through a random symmetry of the board while the net trains on the previous one
+        ## (the loader is started once the buffer has samples to draw)
+        if loader == None:
+            loader = DataLoader(replay, batchSize=BATCH_SIZE, halfLife=SAMPLE_HALF_LIFE)
 
-    train_nn(net, states, policies, results)
+        train_nn(net, loader, TRAINING_SAMPLES // BATCH_SIZE)
 
-    
-    
+    selfPlay.close()
+    gameRecords.close()
+    if loader != None:
+        loader.close()
 
 
-now = datetime.utcnow()
-filename = 'tictactoe_MCTS200{}.h5'.format(now)
-model_path = os.path.join(save_model_path,filename)
-nn.save(model_path)
+    now = datetime.utcnow()
+    filename = 'tictactoe_MCTS200{}.h5'.format(now)
+    model_path = os.path.join(save_model_path,filename)
+    nn.save(model_path)
 
 
 
-# cython board is really worth it, 2x speed improvement
+    # cython board is really worth it, 2x speed improvement
@@ -0,0 +1,224 @@
+import random
+import time
+import os
+import multiprocessing as mp
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from Strat import Strat
+from MCTS import MCTS
+import Playout
+
+## how long to wait for a worker's reply before checking that it is still alive, in seconds
+POLL_TIME = 1.0
+
+
+## root parallel monte-carlo tree search
+## a pool of persistent worker processes each search their own tree from the current board until the deadline,
+## then the visit counts of the root's children are summed over the workers and the most visited move is played
+## the workers keep their trees between moves, moving the root along the moves played as MCTS.update_tree_nodeless does
+class MCTS_RootParallel(Strat):
+
+    def __init__(self, board, update_foo=None, workers=None, searchClass=MCTS):
+        Strat.__init__(self, board, update_foo)
+        if workers == None:
+            workers = os.cpu_count() or 1
+
+        self.connections = []
+        self.processes = []
+        for w in range(workers):
+            parentConn, childConn = mp.Pipe()
+            process = mp.Process(target=root_worker, args=(childConn, board.search_copy(), searchClass, random.getrandbits(32)), daemon=True)
+            process.start()
+            childConn.close()
+            self.connections.append(parentConn)
+            self.processes.append(process)
+
+        self.rootVisits = {}
+
+    ## make and implement a move, searching in every worker until endTime
+    def move(self, board, endTime, aiString="X", oppMove=None):
+
+        ## the workers only need the position, not the game's move history
+        searchBoard = board.search_copy()
+        for conn in self.connections:
+            conn.send(("search", searchBoard, oppMove, endTime))
+
+        ## wait for the workers, keeping the gui alive
+        while time.time() < endTime:
+            self.update_root()
+            time.sleep(0.01)
+
+        ## merge the statistics of the root's children over every worker
+        self.rootVisits = {}
+        count = 0
+        for conn, process in zip(self.connections, self.processes):
+            visits, workerCount = self.receive(conn, process)
+            count += workerCount
+            for move, num, den in visits:
+                total = self.rootVisits.get(move, (0, 0))
+                self.rootVisits[move] = (total[0] + num, total[1] + den)
+
+        x,y,i,j = self.choose_best_move(board)
+
+        board.make_move(x,y,i,j)
+
+        # move every worker's root to the move that was played
+        searchBoard = board.search_copy()
+        for conn in self.connections:
+            conn.send(("advance", searchBoard, (x,y,i,j)))
+
+        print("Count is: {}".format(count), "Total moves is: {}".format(board.totalMoves), "Workers: {}".format(len(self.connections)))
+
+    ## a worker's reply, raising an error if the worker dies before sending it rather than waiting forever
+    def receive(self, conn, process):
+        while not conn.poll(POLL_TIME):
+            if not process.is_alive():
+                raise RuntimeError("root parallel worker {} exited with code {}".format(process.pid, process.exitcode))
+        try:
+            return conn.recv()
+        except (EOFError, OSError):
+            process.join()
+            raise RuntimeError("root parallel worker {} exited with code {}".format(process.pid, process.exitcode))
+
+    ## select the move with the greatest combined denominator
+    def choose_best_move(self, board):
+        if len(self.rootVisits) == 0:
+            return random.choice(board.get_valid_moves())
+        maximum = max(den for num, den in self.rootVisits.values())
+        return random.choice([move for move, (num, den) in self.rootVisits.items() if den == maximum])
+
+    ## the searching is done by the workers during move, so there is nothing to do between moves
+    def consider_moves(self, board):
+        pass
+
+    ## stop the worker processes
+    def close(self):
+        for conn in self.connections:
+            conn.send(("stop",))
+            conn.close()
+        for process in self.processes:
+            process.join()
+        self.connections = []
+        self.processes = []
+
+
+## the loop run by each worker process - a search of type searchClass that is kept between moves
+## messages are ("search", board, oppMove, endTime), ("advance", board, move) and ("stop",)
+def root_worker(conn, board, searchClass, seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    ai = searchClass(board)
+
+    while True:
+        message = conn.recv()
+        if message[0] == "search":
+            board, oppMove, endTime = message[1:]
+            ai.update_tree_nodeless(board, oppMove)
+            boardCopy = board.search_copy()
+            count = 0
+            while time.time() < endTime:
+                ai.consider_moves(boardCopy)
+                count += 1
+            conn.send((ai.root_visits(boardCopy), count))
+        elif message[0] == "advance":
+            board, move = message[1:]
+            ai.update_tree_nodeless(board, move)
+        else:
+            break
+    conn.close()
+
+
+## tree parallel monte-carlo tree search
+## several threads run selection -> expansion -> simulation -> back propagation on one shared tree at once
+## the tree is only changed while holding self.lock, and each thread adds a virtual loss along its path while its playout runs,
+## so the other threads are steered onto different paths instead of all descending the same one
+## the playouts themselves run outside the lock and the GIL: in the compiled kernel from Playout when it has been built,
+## otherwise in a persistent pool of processes that the threads wait on
+## selection, expansion and back propagation are serialised by the lock, so each leaf gets playoutsPerLeaf playouts at once (Playout.random_playouts)
+## to give the threads enough work outside the lock to run in parallel - count is the number of leaves simulated
+class MCTS_TreeParallel(MCTS):
+
+    def __init__(self, board, update_foo=None, threads=None, virtualLoss=1, playoutsPerLeaf=8):
+        MCTS.__init__(self, board, update_foo, playoutsPerLeaf)
+        if threads == None:
+            threads = os.cpu_count() or 1
+        self.threads = threads
+        self.virtualLoss = virtualLoss
+        self.lock = threading.Lock()
+        self.executor = None
+        if Playout.native_random_playouts == None:
+            self.executor = ProcessPoolExecutor(threads)
+
+    ## make and implement a move, with every thread searching the shared tree until endTime
+    def move(self, board, endTime, aiString="X", oppMove=None):
+
+        self.update_tree_nodeless(board, oppMove)
+
+        self.count = 0
+        workers = [threading.Thread(target=self.search_thread, args=(board.search_copy(), endTime)) for t in range(self.threads)]
+        for worker in workers:
+            worker.start()
+
+        ## keep the gui alive while the threads search
+        while time.time() < endTime:
+            self.update_root()
+            time.sleep(0.01)
+        for worker in workers:
+            worker.join()
+
+        bestMoveNode = self.choose_best_move()
+        x,y,i,j = bestMoveNode.move
+
+        board.make_move(x,y,i,j)
+
+        self.update_tree(bestMoveNode, board.search_copy())
+
+        print("Count is: {}".format(self.count), "Total moves is: {}".format(board.totalMoves), "Threads: {}".format(self.threads))
+
+    ## the loop run by each search thread on its own copy of the board
+    def search_thread(self, boardCopy, endTime):
+        while time.time() < endTime:
+            self.consider_moves(boardCopy)
+
+    def consider_moves(self, boardCopy):
+
+        with self.lock:
+            ## select a leaf and move to one of its children, adding a virtual loss along the path
+            boardCopy, leaf, moveCounter = self.selection(boardCopy, self.tree.root)
+            child = self.expansion(boardCopy, leaf)
+            if child != leaf:
+                x,y,i,j = child.move
+                boardCopy.make_move(x,y,i,j)
+                moveCounter += 1
+            child.do_simulate_update()
+            self.add_virtual_loss(child, self.virtualLoss * self.playoutsPerLeaf)
+
+        ## the board copy is the thread's own, so the snapshot is taken outside the lock
+        ## the thread releases the GIL while the playouts run, or while it waits for them
+        snapshot = boardCopy.snapshot()
+        if self.executor == None:
+            xWins, oWins, draws = Playout.native_random_playouts(snapshot, self.playoutsPerLeaf, random.getrandbits(64))
+        else:
+            xWins, oWins, draws = self.executor.submit(Playout.random_playouts, snapshot, self.playoutsPerLeaf).result()
+
+        if child.player == boardCopy.xstr:
+            score = xWins + 0.5 * draws
+        else:
+            score = oWins + 0.5 * draws
+
+        with self.lock:
+            self.add_virtual_loss(child, -self.virtualLoss * self.playoutsPerLeaf)
+            self.back_propagate(child, score, boardCopy, self.playoutsPerLeaf)
+            self.count += 1
+
+        for a in range(moveCounter):
+            boardCopy.un_make_move()
+
+        return boardCopy
+
+    ## stop the playout processes
+    def close(self):
+        if self.executor != None:
+            self.executor.shutdown()
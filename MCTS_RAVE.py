@@ -0,0 +1,84 @@
+import numpy as np
+
+from MCTS import MCTS
+import Selection
+import Playout
+
+
+## monte-carlo tree search with RAVE (rapid action value estimation), using a random playout as the simulation step
+## every expanded node keeps all-moves-as-first (AMAF) statistics in two arrays indexed by the 81 move slots 27*x + 9*y + 3*i + j:
+## after each simulation, every move made later in the game by the player to move at the node counts as if it had been played first there
+## selection blends each child's own value with the AMAF value of its move (Selection.rave_scores), so children are ranked well before they have many visits
+## and an unvisited child is only tried once its AMAF value makes it the best choice - one playout is run per simulation, as the AMAF update needs its moves
+class MCTS_RAVE(MCTS):
+
+    ## select the node to simulate from, making the moves to it on the board
+    ## the search descends by RAVE score, expanding each node the first time it is passed through, and stops at the first unvisited node or at the end of the game
+    ## returns the board, the node, the number of moves made and the move slots from the root to the node
+    def selection(self, board, root):
+        node = root
+        counter = 0
+        path = []
+        while board.game_state() == board.stateDict["ongoing"]:
+            if not node.hasChildren:
+                self.expansion(board, node)
+            children = node.children
+            wi = np.fromiter((child.num for child in children), np.float64, len(children))
+            ni = np.fromiter((child.den for child in children), np.float64, len(children))
+            index = Selection.random_argmax(Selection.rave_scores(wi, ni, node.den, node.amafNum[node.slots], node.amafDen[node.slots]))
+            path.append(node.slots[index])
+            node = children[index]
+            x,y,i,j = node.move
+            board.make_move(x,y,i,j)
+            counter += 1
+            if node.den == 0:
+                break
+        return board, node, counter, path
+
+    ## add a child for every legal move of a node, and its empty AMAF statistics
+    def expansion(self, board, parent):
+        for move in board.get_valid_moves():
+            self.tree.add_node(move, parent)
+        parent.hasChildren = True
+        parent.amafNum = np.zeros(81)
+        parent.amafDen = np.zeros(81)
+        parent.slots = np.array([27*x + 9*y + 3*i + j for x,y,i,j in (child.move for child in parent.children)])
+
+    # simulate one playout from a node, and backpropagate the result and the AMAF statistics along the game tree
+    ## path is the list of move slots from the root to the node
+    def simulation(self, board, node, path):
+        state, playoutMoves = Playout.recorded_playout(board.snapshot())
+        if state == node.player:
+            score = 1
+        elif state == board.stateDict["draw"]:
+            score = 0.5
+        else:
+            score = 0
+
+        self.back_propagate(node, score, board)
+        self.update_amaf(node, np.concatenate((np.array(path, dtype=np.int64), np.frombuffer(playoutMoves, dtype=np.uint8))), len(path), score)
+
+    ## add a simulation to the AMAF statistics of each expanded node from node up to the root
+    ## moves is every move from the root to the end of the game, and the node at depth d is updated with the moves moves[d::2] of the player to move there
+    ## score is for node.player, at depth len(path) - a square is only ever played once in a game, so no move is counted twice
+    def update_amaf(self, node, moves, depth, score):
+        while node != None:
+            if node.amafDen is not None:
+                # the player to move at node is the other player to node.player
+                slots = moves[depth::2]
+                node.amafDen[slots] += 1
+                node.amafNum[slots] += 1 - score
+            node = node.parent
+            depth -= 1
+            score = 1 - score
+
+    def consider_moves(self, boardCopy):
+
+        boardCopy, node, moveCounter, path = self.selection(boardCopy, self.tree.root)
+
+        self.simulation(boardCopy, node, path)
+
+        for a in range(moveCounter):
+            boardCopy.un_make_move()
+
+        return boardCopy
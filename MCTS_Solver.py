@@ -0,0 +1,148 @@
+import random
+import time
+import numpy as np
+
+from MCTS import MCTS
+import Selection
+import Playout
+
+## proven scores, for the player who moved into a node
+WIN, DRAW, LOSS = 1, 0.5, 0
+
+
+## monte-carlo tree search that proves results (MCTS-Solver), using a random playout as the simulation step
+## a node whose result is certain is marked as proven with its score for the player who moved into it: a finished game is proven when it is reached,
+## and a node is proven once one of its children is a proven win for the player to move there, or once all of its children are proven
+## selection never enters a proven node, the proven score is backpropagated in place of a playout, and the search stops once the root is proven
+class MCTS_Solver(MCTS):
+
+    ## make and implement a move, searching until endTime or until the result from the root is proven
+    def move(self, board, endTime, aiString="X", oppMove=None):
+
+        self.update_tree_nodeless(board, oppMove)
+
+        boardCopy = board.search_copy()
+
+        count = 0
+        while time.time() < endTime and self.tree.root.proven == None:
+
+            self.consider_moves(boardCopy)
+
+            # update the gui, if applicable
+            self.update_root()
+            count += 1
+
+        bestMoveNode = self.choose_best_move()
+        x,y,i,j = bestMoveNode.move
+
+        board.make_move(x,y,i,j)
+
+        self.update_tree(bestMoveNode, board.search_copy())
+
+        print("Count is: {}".format(count), "Total moves is: {}".format(board.totalMoves), "Proven: {}".format(bestMoveNode.proven))
+
+    ## select a node to simulate from, avoiding proven nodes, and move the board to it
+    ## the first visit to each child of a node is made before any of them is chosen by its UCB score
+    def selection(self, board, root):
+        node = root
+        counter = 0
+        while node.proven == None:
+            score = self.terminal_score(board)
+            if score != None:
+                node.proven = score
+                break
+
+            if not node.hasChildren:
+                for move in board.get_valid_moves():
+                    self.tree.add_node(move, node)
+                node.hasChildren = True
+
+            children = [child for child in node.children if child.proven == None]
+            unvisited = [child for child in children if child.den == 0]
+            if len(unvisited) > 0:
+                node = random.choice(unvisited)
+                x,y,i,j = node.move
+                board.make_move(x,y,i,j)
+                counter += 1
+                node.proven = self.terminal_score(board)
+                break
+
+            wi = np.fromiter((child.num for child in children), np.float64, len(children))
+            ni = np.fromiter((child.den for child in children), np.float64, len(children))
+            node = children[Selection.random_argmax(self.select_express(wi, ni, node.den))]
+            x,y,i,j = node.move
+            board.make_move(x,y,i,j)
+            counter += 1
+        return board, node, counter
+
+    ## the score of a finished game for the player who just moved, or None if the game is still in play
+    def terminal_score(self, board):
+        state = board.game_state()
+        if state == board.stateDict["ongoing"]:
+            return None
+        if state == board.stateDict["draw"]:
+            return DRAW
+        if state == board.player_just_played():
+            return WIN
+        return LOSS
+
+    # simulate one playout from a node (or use its proven score), and backpropagate the result along the game tree
+    def simulation(self, board, node):
+        if node.proven != None:
+            score = node.proven
+            self.update_proofs(node.parent)
+        else:
+            state = Playout.random_playout(board.snapshot())
+            if state == node.player:
+                score = WIN
+            elif state == board.stateDict["draw"]:
+                score = DRAW
+            else:
+                score = LOSS
+
+        self.back_propagate(node, score, board)
+
+    ## prove a node from its children if they decide it, and carry on up the tree for as long as nodes become proven
+    def update_proofs(self, node):
+        while node != None and node.proven == None:
+            best = None
+            allProven = True
+            for child in node.children:
+                if child.proven == None:
+                    allProven = False
+                elif best == None or child.proven > best:
+                    best = child.proven
+            if best == WIN:
+                # the player to move here has a winning move
+                node.proven = LOSS
+            elif allProven and best != None:
+                node.proven = 1 - best
+            else:
+                return
+            node = node.parent
+
+    ## select the move to make - a proven win if there is one, otherwise the most visited move that isn't a proven loss
+    def choose_best_move(self):
+        children = self.tree.root.children
+        wins = [child for child in children if child.proven == WIN]
+        if len(wins) > 0:
+            return random.choice(wins)
+
+        candidates = [child for child in children if child.proven != LOSS]
+        if len(candidates) == 0:
+            candidates = children
+        maximum = max(child.den for child in candidates)
+        return random.choice([child for child in candidates if child.den == maximum])
+
+    def consider_moves(self, boardCopy):
+        if self.tree.root.proven != None:
+            return boardCopy
+
+        boardCopy, node, moveCounter = self.selection(boardCopy, self.tree.root)
+
+        self.simulation(boardCopy, node)
+
+        for a in range(moveCounter):
+            boardCopy.un_make_move()
+
+        return boardCopy
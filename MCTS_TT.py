@@ -0,0 +1,249 @@
+import random
+import time
+from collections import OrderedDict
+import numpy as np
+
+from MCTS import MCTS
+import Selection
+import Playout
+import Symmetry
+
+
+## monte-carlo tree search over a DAG of positions, using a random playout as the simulation step
+## nodes live in a transposition table keyed by the board's canonical Zobrist key (Board.canonical), so a position reached by different move orders,
+## or any of its symmetric variants, shares its statistics - a node's moves are kept in the frame of the canonical position, and are moved
+## back by the transform of whichever variant is on the board
+## the table persists between moves, so the search below the new root is reused automatically
+class MCTS_TT(MCTS):
+
+    def __init__(self, board, update_foo=None, maxNodes=200000):
+        MCTS.__init__(self, board, update_foo)
+        self.table = TranspositionTable(maxNodes)
+
+    ## the table is keyed by position, so there is no root to move when a move is made
+    def update_tree(self, newRoot, board):
+        pass
+
+    def update_tree_nodeless(self, board, oppMove):
+        pass
+
+    ## make and implement a move using the MCTS strategy
+    def move(self, board, endTime, aiString="X", oppMove=None):
+
+        boardCopy = board.search_copy()
+
+        ## for the allotted search time, build up information about the search DAG
+        count = 0
+        while time.time() < endTime:
+
+            self.consider_moves(boardCopy)
+
+            # update the gui, if applicable
+            self.update_root()
+            count += 1
+
+        x,y,i,j = self.choose_best_move(board)
+
+        # make the move on the board
+        board.make_move(x,y,i,j)
+
+        print("Count is: {}".format(count), "Total moves is: {}".format(board.totalMoves), "Table size is: {}".format(len(self.table)))
+
+    ## get the node for the board's position, creating it if it isn't in the table
+    ## the position's canonical key can be passed in if it is already known, as it is for a node's children
+    def get_node(self, board, key=None):
+        if key == None:
+            key, transform = board.canonical()
+        node = self.table.get(key)
+        if node == None:
+            node = self.table.add(key, TTNode(board.player_just_played()))
+        return node
+
+    ## select a leaf node to explore the DAG from
+    ## returns the path of nodes from the root to the leaf - a position can have several parents, so the path is needed for back propagation
+    def selection(self, board, root):
+        node = root
+        path = [node]
+        counter = 0
+        while not node.is_leaf():
+            children = [self.table.peek(key) for key in node.childKeys]
+            if None in children:
+                # a child has been replaced in the table, so needs simulating from again
+                node.unvisited.append(children.index(None))
+                return board, path, counter
+            wi = np.fromiter((child.num for child in children), np.float64, len(children))
+            ni = np.fromiter((child.den for child in children), np.float64, len(children))
+            index = Selection.random_argmax(self.select_express(wi, ni, node.den))
+            x,y,i,j = self.board_move(board, node.moves[index])
+            board.make_move(x,y,i,j)
+            node = self.table.get(node.childKeys[index])
+            path.append(node)
+            counter += 1
+        return board, path, counter
+
+    ## expand the DAG from a leaf node, and make the move to an unsimulated child to conduct a simulation from
+    ## moves that lead to the same position up to symmetry (the same child key) are kept once, by the first of them
+    ## returns the child node, and whether a move was made to reach it
+    def expansion(self, board, parent):
+        state = board.game_state()
+        if state == board.stateDict["ongoing"]:
+            key, transform = board.canonical()
+            if not parent.hasChildren:
+                childKeys = set()
+                for move in board.get_valid_moves():
+                    x,y,i,j = move
+                    board.make_move(x,y,i,j)
+                    childKey = board.canonical()[0]
+                    board.un_make_move()
+                    if childKey not in childKeys:
+                        childKeys.add(childKey)
+                        parent.moves.append(Symmetry.transform_move(move, transform))
+                        parent.childKeys.append(childKey)
+                parent.unvisited = list(range(len(parent.moves)))
+                parent.hasChildren = True
+            index = parent.unvisited.pop(random.randrange(len(parent.unvisited)))
+            x,y,i,j = Symmetry.transform_move(parent.moves[index], Symmetry.INVERSE[transform])
+            board.make_move(x,y,i,j)
+            return self.get_node(board, parent.childKeys[index]), True
+        else:
+            return parent, False
+
+    # simulate one playout from the end of the path, and backpropagate the result along the path
+    def simulation(self, board, path):
+        node = path[-1]
+        state = Playout.random_playout(board.snapshot())
+        if state == board.stateDict["X win"]:
+            if node.player == board.xstr:
+                score = 1
+            else:
+                score = 0
+        elif state == board.stateDict["O win"]:
+            if node.player == board.ostr:
+                score = 1
+            else:
+                score = 0
+        else:
+            score = 0.5
+
+        self.back_propagate(path, score, board)
+
+    ## back propagate the result of a simulation along the path that was taken through the DAG
+    def back_propagate(self, path, score, board):
+        for node in reversed(path):
+            node.den += 1
+            node.num += score
+            score = 1 - score
+
+    ## a move from a node's moves (in the canonical position's frame) as the move to make on the board
+    def board_move(self, board, move):
+        key, transform = board.canonical()
+        return Symmetry.transform_move(move, Symmetry.INVERSE[transform])
+
+    ## select the best move for the current player to make, given the root's entry in the table - the move whose position has greatest denominator
+    def choose_best_move(self, board):
+        root = self.get_node(board)
+        if not root.hasChildren:
+            return random.choice(board.get_valid_moves())
+        maximum = 0
+        bestMoves = []
+        for move, key in zip(self.board_moves(board, root), root.childKeys):
+            child = self.table.peek(key)
+            den = 0 if child == None else child.den
+            if den == maximum:
+                bestMoves.append(move)
+            elif den > maximum:
+                bestMoves = [move]
+                maximum = den
+
+        return random.choice(bestMoves)
+
+    ## the (move, num, den) statistics of each move from the board's position, for combining the results of several searches
+    def root_visits(self, board):
+        root = self.get_node(board)
+        visits = []
+        for move, key in zip(self.board_moves(board, root), root.childKeys):
+            child = self.table.peek(key)
+            if child != None:
+                visits.append((move, child.num, child.den))
+        return visits
+
+    ## all of a node's moves as the moves to make on the board
+    def board_moves(self, board, node):
+        key, transform = board.canonical()
+        return [Symmetry.transform_move(move, Symmetry.INVERSE[transform]) for move in node.moves]
+
+    def consider_moves(self, boardCopy):
+
+        root = self.get_node(boardCopy)
+
+        ## select a leaf node using the UCT formula over the DAG
+        boardCopy, path, moveCounter = self.selection(boardCopy, root)
+
+        ## move to an unsimulated child of the leaf (at random)
+        child, moved = self.expansion(boardCopy, path[-1])
+        if moved:
+            path.append(child)
+            moveCounter += 1
+
+        ## carry out a simulation of the game from the child node and use this info to update the DAG
+        self.simulation(boardCopy, path)
+
+        for a in range(moveCounter):
+            boardCopy.un_make_move()
+
+        return boardCopy
+
+
+## a size-capped table of nodes keyed by position
+## when the table is full the least recently used node is replaced, so positions from earlier in the game are dropped first
+class TranspositionTable():
+
+    def __init__(self, maxSize):
+        self.maxSize = maxSize
+        self.nodes = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.nodes)
+
+    ## get the node for a key (or None), marking it as recently used
+    def get(self, key):
+        node = self.nodes.get(key)
+        if node != None:
+            self.nodes.move_to_end(key)
+        return node
+
+    ## get the node for a key (or None) without changing its age
+    def peek(self, key):
+        return self.nodes.get(key)
+
+    ## add a node to the table, replacing the least recently used nodes if it is full
+    def add(self, key, node):
+        self.nodes[key] = node
+        self.nodes.move_to_end(key)
+        while len(self.nodes) > self.maxSize:
+            self.nodes.popitem(last=False)
+            self.evictions += 1
+        return node
+
+
+## a position in the search DAG
+## the statistics are from the point of view of player, the player who has just moved into the position
+class TTNode():
+    def __init__(self, player):
+        self.num = 0
+        self.den = 0
+        self.player = player
+
+        ## the moves out of this position (in the canonical position's frame) and the table keys of the positions they lead to, filled in on expansion
+        self.moves = []
+        self.childKeys = []
+        self.unvisited = [] # indexes of the moves that haven't been simulated from yet
+        self.hasChildren = False
+
+    def __repr__(self):
+        return "Ratio {} / {} || Player: {} || Children: {}".format(self.num, self.den, self.player, len(self.moves))
+
+    ## leaf nodes have a potential child node that hasn't been simulated from yet
+    def is_leaf(self):
+        return not self.hasChildren or len(self.unvisited) > 0
@@ -0,0 +1,258 @@
+## random playouts from a compact snapshot of a board (see Board.snapshot)
+## the playout works directly on the bitmasks, without a Board or any per move objects, so it is cheap to run in another process
+## the compiled kernel in _playout.c (python setup.py build_ext --inplace) is used when it has been built, otherwise the pure Python version below
+## both choose their moves with the same generator and in the same order, so they give the same result for the same seed
+
+import random
+import numpy as np
+
+from LocalTables import FULL, WINNING, OPEN_LINE
+
+try:
+    from _playout import random_playout as native_random_playout
+    from _playout import random_playouts as native_random_playouts
+    from _playout import recorded_playout as native_recorded_playout
+except ImportError:
+    native_random_playout = None
+    native_random_playouts = None
+    native_recorded_playout = None
+
+MASK64 = (1 << 64) - 1
+
+## CELLS[empty] is the tuple of squares 3*i + j set in the 9 bit mask empty
+CELLS = tuple(tuple(c for c in range(9) if empty >> c & 1) for empty in range(FULL + 1))
+
+## the same tables as arrays, for playing many games at once: CELL_BITS[mask] is the (9,) bools of the squares in mask,
+## WINNING_ARRAY[mask] is WINNING[mask] and OPEN_LINE_ARRAY[mask] is OPEN_LINE[mask]
+NINE = np.arange(9)
+CELL_BITS = (np.arange(FULL + 1)[:,None] >> NINE & 1).astype(bool)
+WINNING_ARRAY = np.array(WINNING, dtype=bool)
+OPEN_LINE_ARRAY = np.array(OPEN_LINE, dtype=bool)
+
+## the result codes used by numpy_random_playouts
+ONGOING, X_WIN, O_WIN, DRAW = 0, 1, 2, 3
+
+
+## play random moves from the snapshot's position until the game ends, and return the result as a state string ("X", "O" or "D")
+## moves are chosen uniformly from the legal moves, as MCTS.simulation does
+## the playout stops as soon as neither player can still win (see Board.nobody_can_win), as the result is then a draw
+def random_playout(snapshot, seed=None):
+    if seed == None:
+        seed = random.getrandbits(64)
+    if native_random_playout != None:
+        return native_random_playout(snapshot, seed)
+    return python_random_playout(snapshot, seed)
+
+## run count playouts from the same position, and return how they ended as (xWins, oWins, draws)
+## playout n is seeded with the n-th output of a generator seeded with seed, so it is the playout random_playout would give for that seed
+def random_playouts(snapshot, count, seed=None):
+    if seed == None:
+        seed = random.getrandbits(64)
+    if native_random_playouts != None:
+        return native_random_playouts(snapshot, count, seed)
+    return numpy_random_playouts(snapshot, count, seed)
+
+## a random_playout that also returns the moves it played, as (state, moves) where moves is bytes of the move indexes 9*k + c in order
+## (27*x + 9*y + 3*i + j for move (x,y,i,j)), for the all-moves-as-first statistics of MCTS_RAVE
+def recorded_playout(snapshot, seed=None):
+    if seed == None:
+        seed = random.getrandbits(64)
+    if native_recorded_playout != None:
+        return native_recorded_playout(snapshot, seed)
+    moves = []
+    state = python_random_playout(snapshot, seed, moves)
+    return state, bytes(moves)
+
+## a splitmix64 generator - the same as next_random in _playout.c
+class SplitMix64():
+
+    def __init__(self, seed):
+        self.state = seed & MASK64
+
+    def next(self):
+        self.state = (self.state + 0x9E3779B97F4A7C15) & MASK64
+        z = self.state
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        return z ^ (z >> 31)
+
+    ## a random integer from 0 to n - 1
+    def below(self, n):
+        return self.next() % n
+
+## the pure Python playout - the index of each move played is appended to moves if it is given
+def python_random_playout(snapshot, seed, moves=None):
+    rng = SplitMix64(seed)
+    xBits, oBits, player, grid = snapshot
+    xBits = list(xBits)
+    oBits = list(oBits)
+    xWon = oWon = done = 0
+    for k in range(9):
+        if WINNING[xBits[k]]:
+            xWon |= 1 << k
+        elif WINNING[oBits[k]]:
+            oWon |= 1 << k
+        if xBits[k] | oBits[k] == FULL or (xWon | oWon) >> k & 1:
+            done |= 1 << k
+    xWinnable = oWinnable = 0
+    for k in range(9):
+        xWinnable, oWinnable = update_winnable(k, xBits[k], oBits[k], xWon, oWon, done, xWinnable, oWinnable)
+    if grid != -1 and done >> grid & 1:
+        # a forced local board that is already done leaves no legal moves
+        return game_result(xWon, oWon, xWinnable, oWinnable) or "D"
+
+    while True:
+        state = game_result(xWon, oWon, xWinnable, oWinnable)
+        if state != None:
+            return state
+
+        ## pick a random empty square, either in the forced local board or over every open local board (in the order of BitBoard.get_valid_moves)
+        if grid == -1:
+            count = 0
+            for k in range(9):
+                if not done >> k & 1:
+                    count += len(CELLS[FULL ^ (xBits[k] | oBits[k])])
+            choice = rng.below(count)
+            for k in range(9):
+                if not done >> k & 1:
+                    cells = CELLS[FULL ^ (xBits[k] | oBits[k])]
+                    if choice < len(cells):
+                        break
+                    choice -= len(cells)
+        else:
+            k = grid
+            cells = CELLS[FULL ^ (xBits[k] | oBits[k])]
+            choice = rng.below(len(cells))
+        c = cells[choice]
+        if moves != None:
+            moves.append(9 * k + c)
+
+        if player == "X":
+            pieces = xBits[k] = xBits[k] | 1 << c
+            if WINNING[pieces]:
+                xWon |= 1 << k
+                done |= 1 << k
+            player = "O"
+        else:
+            pieces = oBits[k] = oBits[k] | 1 << c
+            if WINNING[pieces]:
+                oWon |= 1 << k
+                done |= 1 << k
+            player = "X"
+        if xBits[k] | oBits[k] == FULL:
+            done |= 1 << k
+        xWinnable, oWinnable = update_winnable(k, xBits[k], oBits[k], xWon, oWon, done, xWinnable, oWinnable)
+
+        grid = -1 if done >> c & 1 else c
+
+## the winnable masks (see Board.nobody_can_win) with the bit of local board k set from its pieces and state
+## a player can win the board if they have won it, or if it is in play and some line has none of the other player's pieces
+def update_winnable(k, xPieces, oPieces, xWon, oWon, done, xWinnable, oWinnable):
+    bit = 1 << k
+    xWinnable &= ~bit
+    oWinnable &= ~bit
+    if xWon & bit or (not done & bit and OPEN_LINE[oPieces]):
+        xWinnable |= bit
+    if oWon & bit or (not done & bit and OPEN_LINE[xPieces]):
+        oWinnable |= bit
+    return xWinnable, oWinnable
+
+## the pure Python (NumPy) version of random_playouts, which plays all count games at once
+## the games are held as arrays of count boards, with one splitmix64 state per game, and every step makes one move in each unfinished game
+def numpy_random_playouts(snapshot, count, seed):
+    rng = SplitMix64(seed)
+    states = np.array([rng.next() for n in range(count)], dtype=np.uint64)
+
+    xStart, oStart, player, grid = snapshot
+    xBits = np.tile(np.array(xStart, dtype=np.int64) & FULL, (count, 1))
+    oBits = np.tile(np.array(oStart, dtype=np.int64) & FULL, (count, 1))
+    xWon = np.zeros(count, dtype=np.int64)
+    oWon = np.zeros(count, dtype=np.int64)
+    done = np.zeros(count, dtype=np.int64)
+    for k in range(9):
+        if WINNING[xStart[k] & FULL]:
+            xWon |= 1 << k
+        elif WINNING[oStart[k] & FULL]:
+            oWon |= 1 << k
+        if (xStart[k] | oStart[k]) & FULL == FULL or (xWon[0] | oWon[0]) >> k & 1:
+            done |= 1 << k
+    xStartWinnable = oStartWinnable = 0
+    for k in range(9):
+        xStartWinnable, oStartWinnable = update_winnable(k, xStart[k] & FULL, oStart[k] & FULL, int(xWon[0]), int(oWon[0]), int(done[0]), xStartWinnable, oStartWinnable)
+    xWinnable = np.full(count, xStartWinnable, dtype=np.int64)
+    oWinnable = np.full(count, oStartWinnable, dtype=np.int64)
+    xToMove = np.full(count, player == "X")
+    grids = np.full(count, grid, dtype=np.int64)
+
+    result = game_results(xWon, oWon, xWinnable, oWinnable)
+    if grid != -1 and done[0] >> grid & 1:
+        # a forced local board that is already done leaves no legal moves
+        result[result == ONGOING] = DRAW
+
+    active = np.flatnonzero(result == ONGOING)
+    while len(active) > 0:
+        ## the legal squares of each game as (n, 81) bools in the order of BitBoard.get_valid_moves, and the choice-th of them is played
+        empty = FULL ^ (xBits[active] | oBits[active])
+        openBoards = (done[active,None] >> NINE & 1) == 0
+        g = grids[active,None]
+        allowed = np.where(g == -1, openBoards, NINE == g)
+        legal = (CELL_BITS[empty] & allowed[:,:,None]).reshape(-1, 81)
+        counts = np.cumsum(legal, axis=1)
+
+        states[active], z = splitmix64_next(states[active])
+        choice = (z % counts[:,-1].astype(np.uint64)).astype(np.int64)
+        move = np.argmax(counts > choice[:,None], axis=1)
+        k = move // 9
+        c = move % 9
+        bit = np.left_shift(1, c)
+
+        xMove = xToMove[active]
+        xBits[active[xMove], k[xMove]] |= bit[xMove]
+        oBits[active[~xMove], k[~xMove]] |= bit[~xMove]
+        xLocal = xBits[active, k]
+        oLocal = oBits[active, k]
+        won = np.where(xMove, WINNING_ARRAY[xLocal], WINNING_ARRAY[oLocal])
+        boardBit = np.left_shift(1, k)
+        xWon[active] |= np.where(won & xMove, boardBit, 0)
+        oWon[active] |= np.where(won & ~xMove, boardBit, 0)
+        done[active] |= np.where(won | ((xLocal | oLocal) == FULL), boardBit, 0)
+        xToMove[active] = ~xMove
+        grids[active] = np.where(done[active] >> c & 1, -1, c)
+
+        inPlay = (done[active] >> k & 1) == 0
+        xCanWin = (xWon[active] >> k & 1 == 1) | (inPlay & OPEN_LINE_ARRAY[oLocal])
+        oCanWin = (oWon[active] >> k & 1 == 1) | (inPlay & OPEN_LINE_ARRAY[xLocal])
+        xWinnable[active] = (xWinnable[active] & ~boardBit) | np.where(xCanWin, boardBit, 0)
+        oWinnable[active] = (oWinnable[active] & ~boardBit) | np.where(oCanWin, boardBit, 0)
+
+        result[active] = game_results(xWon[active], oWon[active], xWinnable[active], oWinnable[active])
+        active = active[result[active] == ONGOING]
+
+    return int(np.sum(result == X_WIN)), int(np.sum(result == O_WIN)), int(np.sum(result == DRAW))
+
+## advance an array of splitmix64 states, returning the new states and their outputs (the same as SplitMix64.next for each)
+def splitmix64_next(states):
+    states = states + np.uint64(0x9E3779B97F4A7C15)
+    z = states
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return states, z ^ (z >> np.uint64(31))
+
+## the results of arrays of games given their global masks, as result codes - game_result for many games at once
+def game_results(xWon, oWon, xWinnable, oWinnable):
+    result = np.zeros(len(xWon), dtype=np.int8)
+    result[~WINNING_ARRAY[xWinnable] & ~WINNING_ARRAY[oWinnable]] = DRAW
+    result[WINNING_ARRAY[oWon]] = O_WIN
+    result[WINNING_ARRAY[xWon]] = X_WIN
+    return result
+
+## the result of the game given the global masks, or None if it is still in play - the same rules as BitBoard.game_state
+## once every local board is done only the won boards are winnable, so a finished game with no winner is a draw here too
+def game_result(xWon, oWon, xWinnable, oWinnable):
+    if WINNING[xWon]:
+        return "X"
+    if WINNING[oWon]:
+        return "O"
+    if not WINNING[xWinnable] and not WINNING[oWinnable]:
+        return "D"
+    return None
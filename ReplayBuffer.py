@@ -0,0 +1,88 @@
+## Ultimate Tic Tac Toe project - the replay buffer of self-play samples for training the net
+## the samples are kept on disk in memory mapped NumPy arrays, so the buffer can hold far more than fits in memory
+## and only the samples drawn for training are read
+
+import os
+import math
+import numpy as np
+
+
+## a fixed capacity ring of (state, policy, result) samples in a directory of .npy files
+## states are board.export() arrays (9, 9), policies are the 81 visit proportions in the order of Board.flatten, and results are 1, 0 or -1
+## once the buffer is full each new sample overwrites the oldest, and the buffer is reopened where it left off if the directory already holds one
+##DTI: the samples are in slots position - size to position - 1 (mod capacity), oldest first
+class ReplayBuffer():
+
+    def __init__(self, directory, capacity=1000000):
+        os.makedirs(directory, exist_ok=True)
+        metaPath = os.path.join(directory, "meta.npy")
+        if os.path.exists(metaPath):
+            self.meta = np.load(metaPath, mmap_mode="r+")
+            mode = "r+"
+        else:
+            self.meta = np.lib.format.open_memmap(metaPath, mode="w+", dtype=np.int64, shape=(3,))
+            self.meta[:] = (capacity, 0, 0)
+            mode = "w+"
+        # the capacity of a reopened buffer is the one it was made with
+        self.capacity = int(self.meta[0])
+
+        self.states = np.lib.format.open_memmap(os.path.join(directory, "states.npy"), mode=mode, dtype=np.float32, shape=(self.capacity, 9, 9))
+        self.policies = np.lib.format.open_memmap(os.path.join(directory, "policies.npy"), mode=mode, dtype=np.float32, shape=(self.capacity, 81))
+        self.results = np.lib.format.open_memmap(os.path.join(directory, "results.npy"), mode=mode, dtype=np.float32, shape=(self.capacity,))
+
+    ## the next slot to write
+    @property
+    def position(self):
+        return int(self.meta[1])
+
+    ## the number of samples held
+    def __len__(self):
+        return int(self.meta[2])
+
+    ## add samples, given sequences of states, policies and results (such as the lists from SelfPlay.play_game)
+    def add(self, states, policies, results):
+        states = np.asarray(states, dtype=np.float32)
+        policies = np.asarray(policies, dtype=np.float32)
+        results = np.asarray(results, dtype=np.float32)
+        count = len(results)
+        if count > self.capacity:
+            # only the newest samples would survive
+            states, policies, results = states[-self.capacity:], policies[-self.capacity:], results[-self.capacity:]
+            count = self.capacity
+
+        ## the slots wrap round to the start of the arrays
+        slots = (self.position + np.arange(count)) % self.capacity
+        self.states[slots] = states
+        self.policies[slots] = policies
+        self.results[slots] = results
+
+        self.meta[1] = (self.position + count) % self.capacity
+        self.meta[2] = min(len(self) + count, self.capacity)
+
+    ## draw count samples at random, returning arrays (states, policies, results)
+    ## the samples are drawn uniformly, or if halfLife is given the chance of drawing a sample halves for every halfLife samples added after it
+    def sample(self, count, halfLife=None, rng=None):
+        if len(self) == 0:
+            raise ValueError("can't sample from an empty replay buffer")
+        if rng is None:
+            rng = np.random.default_rng()
+
+        if halfLife == None:
+            ages = rng.integers(0, len(self), count)
+        else:
+            ## the ages follow an exponential distribution cut off at the oldest sample, drawn by inverting its distribution function
+            rate = math.log(2) / halfLife
+            uniform = rng.random(count)
+            ages = np.floor(-np.log1p(-uniform * -np.expm1(-rate * len(self))) / rate).astype(np.int64)
+            ages = np.minimum(ages, len(self) - 1)
+
+        # the slots are read in order, so the memory map is read as sequentially as it can be
+        slots = np.sort((self.position - 1 - ages) % self.capacity)
+        return np.array(self.states[slots]), np.array(self.policies[slots]), np.array(self.results[slots])
+
+    ## write the samples out to disk
+    def flush(self):
+        self.states.flush()
+        self.policies.flush()
+        self.results.flush()
+        self.meta.flush()
@@ -0,0 +1,54 @@
+## vectorized child scoring for the tree searches
+## every child of a node is scored in one NumPy expression from arrays of the children's statistics
+
+import random
+import math
+import numpy as np
+
+EXPLORATION = 1.4142
+
+## the RAVE bias b of the blending schedule - smaller values trust the AMAF statistics for longer
+RAVE_BIAS = 0.1
+
+
+## UCT scores, given arrays of the children's numerators wi and denominators ni, and the parent's denominator Ni
+## children that haven't been simulated from score infinity so they are tried first
+def ucb_scores(wi, ni, Ni, c=EXPLORATION):
+    wi = np.asarray(wi, dtype=np.float64)
+    ni = np.asarray(ni, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = wi / ni + c * np.sqrt(math.log(Ni) / ni)
+    scores[ni == 0] = np.inf
+    return scores
+
+## PUCT scores as in the neural net version, weighting the exploration term by the network's prior for each child
+def puct_scores(wi, ni, Ni, prior, c=EXPLORATION):
+    wi = np.asarray(wi, dtype=np.float64)
+    ni = np.asarray(ni, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = wi / ni + c * np.asarray(prior) * (Ni ** 0.5) / (1 + ni)
+    scores[ni == 0] = np.inf
+    return scores
+
+## RAVE scores, blending each child's UCT value with its all-moves-as-first value, given the arrays of the AMAF numerators ai and denominators mi as well
+## the weight of the AMAF value is beta = mi / (ni + mi + 4 b^2 ni mi), which goes from 1 for an unvisited child towards 0 as the child's own visits build up
+## an unvisited child is scored by its AMAF value alone, and only a child with no statistics at all scores infinity
+def rave_scores(wi, ni, Ni, ai, mi, b=RAVE_BIAS, c=EXPLORATION):
+    wi = np.asarray(wi, dtype=np.float64)
+    ni = np.asarray(ni, dtype=np.float64)
+    ai = np.asarray(ai, dtype=np.float64)
+    mi = np.asarray(mi, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        beta = mi / (ni + mi + 4 * b * b * ni * mi)
+        value = np.where(ni > 0, wi / ni, 0)
+        amaf = np.where(mi > 0, ai / mi, 0)
+        scores = np.where(mi > 0, (1 - beta) * value + beta * amaf, value) + c * np.sqrt(math.log(max(Ni, 1)) / (ni + 1))
+    scores[(ni == 0) & (mi == 0)] = np.inf
+    return scores
+
+## the index of the highest score, choosing at random between ties
+def random_argmax(scores):
+    bestIndexes = np.flatnonzero(scores == scores.max())
+    if len(bestIndexes) == 1:
+        return int(bestIndexes[0])
+    return int(random.choice(bestIndexes))
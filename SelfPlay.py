@@ -0,0 +1,225 @@
+## Ultimate Tic Tac Toe project - self-play games for training the net
+## games are played by a pool of worker processes, each with its own copy of the net, and sent back to the trainer as they finish
+## the trainer publishes new weights by saving them to the weights file, and each worker loads them before its next game
+
+import random
+import os
+import sys
+import queue
+import traceback
+import multiprocessing as mp
+import numpy as np
+
+from Board import Board
+from MCTS_ML import MCTS_ML
+from Evaluator import shared_cache, sharedCaches, shared_evaluator, close_shared_evaluator
+from GameRecord import record_board
+
+MCTS_ITERS = 400
+
+## the number of leaves each self-play search sends to the net at once (see MCTS_ML)
+SELF_PLAY_BATCH = 8
+
+## how long to wait for a finished game before checking that the workers are still alive, in seconds
+POLL_TIME = 1.0
+
+
+class MCTS_ML_train(MCTS_ML):
+    def __init__(self, board, neuralNet=None, batchSize=SELF_PLAY_BATCH):
+        if neuralNet == None:
+            ## make a neural net of the right shape
+            pass
+        
+        ## every search with the same net shares one evaluation cache, so openings aren't evaluated afresh each game
+        ## and one batch evaluator, so a worker runs a single evaluating thread however many games it plays
+        evaluator = None
+        if batchSize > 1:
+            evaluator = shared_evaluator(neuralNet, batchSize)
+        MCTS_ML.__init__(self, board, neuralNet, batchSize=batchSize, cache=shared_cache(neuralNet), evaluator=evaluator)
+
+    ## select moves at weighted randomness for the current player to make, given the current state of the game tree
+    def choose_best_move(self):
+        children = self.tree.root.children
+
+        total = float(self.tree.root.den)
+        weightedProbs = [child.den / total for child in children]
+        bestNode = random.choices(children, weights = weightedProbs)[0]
+        return bestNode
+
+    def return_policy(self):
+        children = self.tree.root.children
+
+        total = float(self.tree.root.den)
+
+        policy = np.zeros((3,3,3,3))
+        for child in children:
+            x,y,i,j = child.move
+            policy[x,y,i,j] += child.den
+
+        policy = policy / total
+        policy = Board.flatten(policy)
+        return policy
+
+
+## iterations is the number of leaves to evaluate, which the search takes ai.batchSize at a time
+def do_one_move(ai, board, iterations=MCTS_ITERS):
+    lastMove = board.get_last_move()
+    ai.update_tree_nodeless(board, lastMove)
+    
+    for it in range(0, iterations, ai.batchSize):
+        print(it, "/", iterations)
+        ai.consider_moves(board)
+    moveNode = ai.choose_best_move()
+    move = moveNode.move
+    
+    policy = ai.return_policy()
+    state = board.export()
+    
+    ai.update_tree(moveNode, board.search_copy())
+
+    x,y,i,j  = move
+    board.make_move(x,y,i,j)
+
+    return state, policy
+
+def play_game(net1, net2, iterations=MCTS_ITERS):
+    b = Board()
+    p1 = MCTS_ML_train(b, net1)
+    p2 = MCTS_ML_train(b, net2)
+
+    stateList = []
+    policyList = []
+    resultList = []
+
+    p1Player = b.xstr
+    while b.game_state() == b.stateDict["ongoing"]:
+        print("move made")
+        if b.next_player == p1Player:
+            ai = p1
+        else:
+            ai = p2
+
+        state, policy = do_one_move(ai, b, iterations)
+
+        policyList.append(policy)
+        stateList.append(state)
+
+    p1.close()
+    p2.close()
+
+    # update the result associated with each state-policy pair to reflect the result of the game
+    gameState = b.game_state()
+    if gameState == b.stateDict["X win"]:
+        result = 1
+    elif gameState == b.stateDict["O win"]:
+        result = -1
+    else:
+        result = 0
+
+    for p in policyList:
+        resultList.append(result)
+        result *= -1
+
+    return stateList, policyList, resultList, gameState, record_board(b, visits=policyList)
+
+
+## a pool of worker processes playing games of the net against itself
+## the workers start playing once the first weights are published, and finished games are read with games()
+## each game comes with its GameRecord and the version of the weights it was played with, which is the number of publish calls made before it started
+class SelfPlayPool():
+
+    def __init__(self, weightsPath, workers=None, iterations=MCTS_ITERS):
+        if workers == None:
+            workers = os.cpu_count() or 1
+        self.weightsPath = weightsPath
+
+        ## the workers are spawned rather than forked, as tensorflow can't be used in a forked copy of a process that has already loaded it
+        context = mp.get_context("spawn")
+        self.version = context.Value("i", 0)
+        self.records = context.Queue()
+        self.stopping = context.Event()
+        self.processes = []
+        for w in range(workers):
+            process = context.Process(target=self_play_worker, args=(weightsPath, self.version, self.records, self.stopping, iterations, random.getrandbits(32)), daemon=True)
+            process.start()
+            self.processes.append(process)
+
+    ## save the net's weights for the workers, which load them before their next game
+    ## the weights are written to a temporary file and moved into place, so a worker never loads a partly written file
+    def publish(self, net):
+        root, extension = os.path.splitext(self.weightsPath)
+        temporaryPath = root + ".tmp" + extension
+        net.save(temporaryPath)
+        os.replace(temporaryPath, self.weightsPath)
+        with self.version.get_lock():
+            self.version.value += 1
+
+    ## the next count finished games, as (stateList, policyList, resultList, gameState, record, version) in the order they finish
+    ## an error in a worker is raised here, as is a worker dying without reporting one (e.g. killed when out of memory)
+    def games(self, count):
+        finished = 0
+        while finished < count:
+            try:
+                game = self.records.get(timeout=POLL_TIME)
+            except queue.Empty:
+                self.check_workers()
+                continue
+            if isinstance(game, Exception):
+                raise game
+            finished += 1
+            yield game
+
+    ## raise an error if any worker process has exited
+    def check_workers(self):
+        for process in self.processes:
+            if not process.is_alive():
+                raise RuntimeError("self-play worker {} exited with code {}".format(process.pid, process.exitcode))
+
+    ## stop the worker processes - games still being played are abandoned
+    def close(self):
+        self.stopping.set()
+        for process in self.processes:
+            process.terminate()
+            process.join()
+        self.processes = []
+
+
+## the loop run by each self-play worker process
+## the worker waits for the first weights, and loads the weights again whenever a new version has been published since its last game
+## an error is sent back in place of a game, with the worker's traceback as its message (tensorflow's errors don't all pickle), and stops the worker
+def self_play_worker(weightsPath, version, records, stopping, iterations, seed):
+    random.seed(seed)
+    np.random.seed(seed)
+
+    # the searches print every iteration, so the worker's output is discarded
+    sys.stdout = open(os.devnull, 'w')
+
+    try:
+        play_games(weightsPath, version, records, stopping, iterations)
+    except Exception:
+        records.put(RuntimeError("self-play worker {} failed:\n{}".format(os.getpid(), traceback.format_exc())))
+
+## play games with the latest weights until the pool is stopping, putting each finished game on records
+def play_games(weightsPath, version, records, stopping, iterations):
+    ## one thread each for tensorflow, so that the workers don't compete for the cores and the pool scales with their number
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(1)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    from keras import models
+
+    net = None
+    loaded = 0
+    while not stopping.is_set():
+        if version.value == 0:
+            stopping.wait(0.1)
+            continue
+        if version.value != loaded:
+            loaded = version.value
+            if net != None:
+                # the old net's cached evaluations and evaluating thread are of no more use
+                sharedCaches.pop(id(net), None)
+                close_shared_evaluator(net)
+            net = models.load_model(weightsPath)
+
+        stateList, policyList, resultList, gameState, record = play_game(net, net, iterations)
+        records.put((stateList, policyList, resultList, gameState, record, loaded))
@@ -0,0 +1,47 @@
+## Ultimate Tic Tac Toe project - the 8 symmetries of the board
+## a rotation or reflection of the square moves local board (x,y) and square (i,j) within it by the same transform,
+## so a position and its transforms are the same game - the local board a move sends the opponent to is the one at the move's square, which moves with it
+## positions are in the layout of Board.export, (9,9) indexed [3*x + y, 3*i + j], and policies in the order of Board.flatten, 81 indexed 27*x + 9*y + 3*i + j
+
+import numpy as np
+
+## the transforms of a cell (i,j) of a 3x3 grid - the identity, the rotations by 90, 180 and 270 degrees, and the four reflections
+TRANSFORMS = (lambda i, j: (i, j), lambda i, j: (j, 2 - i), lambda i, j: (2 - i, 2 - j), lambda i, j: (2 - j, i),
+              lambda i, j: (i, 2 - j), lambda i, j: (2 - i, j), lambda i, j: (j, i), lambda i, j: (2 - j, 2 - i))
+COUNT = len(TRANSFORMS)
+
+## CELLS[t][c] is the cell that cell c = 3*i + j is moved to by transform t, and INVERSE_CELLS[t][c] the cell that is moved to c
+CELLS = np.array([[3 * transform(c // 3, c % 3)[0] + transform(c // 3, c % 3)[1] for c in range(9)] for transform in TRANSFORMS])
+INVERSE_CELLS = np.argsort(CELLS, axis=1)
+
+## MOVES[t][m] is the move index that move m = 9*k + c is moved to by transform t, and INVERSE_MOVES[t][m] the move that is moved to m
+MOVES = (9 * CELLS[:, :, None] + CELLS[:, None, :]).reshape(COUNT, 81)
+INVERSE_MOVES = np.argsort(MOVES, axis=1)
+
+## INVERSE[t] is the transform that undoes transform t
+INVERSE = tuple(next(u for u in range(COUNT) if (CELLS[u][CELLS[t]] == np.arange(9)).all()) for t in range(COUNT))
+
+
+## the move (x,y,i,j) that a move is moved to by transform t
+def transform_move(move, t):
+    x,y,i,j = move
+    x, y = TRANSFORMS[t](x, y)
+    i, j = TRANSFORMS[t](i, j)
+    return (x, y, i, j)
+
+## a position (or any array whose last two axes are in the layout of Board.export, such as Board.planes) transformed by t
+def transform_state(state, t):
+    cells = INVERSE_CELLS[t]
+    return state[..., cells[:, None], cells[None, :]]
+
+## a policy (or any array whose last axis is the 81 moves) transformed by t
+def transform_policy(policy, t):
+    return policy[..., INVERSE_MOVES[t]]
+
+## a batch of (n, 9, 9) states and (n, 81) policies with each state and its policy transformed by the same transform, given an array of the n transforms
+def transform_batch(states, policies, transforms):
+    rows = np.arange(len(transforms))
+    cells = INVERSE_CELLS[transforms]
+    states = states[rows[:, None, None], cells[:, :, None], cells[:, None, :]]
+    policies = policies[rows[:, None], INVERSE_MOVES[transforms]]
+    return states, policies
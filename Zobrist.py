@@ -0,0 +1,59 @@
+## Zobrist hashing tables for Ultimate Tic Tac Toe positions
+## a position's key is the xor of one random 64 bit number per piece on the board, one for the player to move and one for the local grid they must play in
+
+import random
+
+import Symmetry
+
+## seeded so that every process (and every run) gives the same key for the same position
+_rng = random.Random(0x5EED)
+
+## PIECE_KEYS[player][27*x + 9*y + 3*i + j] is the key for that player's piece on square (x,y,i,j)
+PIECE_KEYS = {player : tuple(_rng.getrandbits(64) for a in range(81)) for player in ("X", "O")}
+
+## xored in when O is to move
+SIDE_KEYS = {"X" : 0, "O" : _rng.getrandbits(64)}
+
+## GRID_KEYS[next_grid] for each forced local grid (x,y), and None for a free choice of grid
+GRID_KEYS = {(x,y) : _rng.getrandbits(64) for x in range(3) for y in range(3)}
+GRID_KEYS[None] = 0
+
+## the keys under each of the 8 symmetries of the board (see Symmetry), so that the keys of every transform of a position can be worked out together
+## the 8 keys of a piece are packed into one integer, 64 bits per transform, so they are all combined with one xor:
+## bits 64*t to 64*t + 63 of SYMMETRIC_PIECE_KEYS[player][m] are the key of the square that square m is moved to by transform t
+## SYMMETRIC_GRID_KEYS[next_grid][t] is the key of the grid that the forced grid is moved to by transform t
+MASK64 = (1 << 64) - 1
+SYMMETRIC_PIECE_KEYS = {player : tuple(sum(PIECE_KEYS[player][Symmetry.MOVES[t][m]] << 64*t for t in range(Symmetry.COUNT)) for m in range(81)) for player in ("X", "O")}
+SYMMETRIC_GRID_KEYS = {grid : tuple(GRID_KEYS[grid if grid == None else Symmetry.TRANSFORMS[t](*grid)] for t in range(Symmetry.COUNT)) for grid in GRID_KEYS}
+
+## the xor of the packed keys of every piece in a 9 bit mask of one local board, with keys the packed keys of that board's 9 squares
+def _local_keys(keys):
+    table = [0] * (1 << 9)
+    for mask in range(1, 1 << 9):
+        low = mask & -mask
+        table[mask] = table[mask ^ low] ^ keys[low.bit_length() - 1]
+    return tuple(table)
+
+## SYMMETRIC_LOCAL_KEYS[player][k][mask] is the xor of SYMMETRIC_PIECE_KEYS[player][9*k + c] for the bits c of a 9 bit mask of local board k,
+## so the packed keys of a position take 18 lookups, and are only worked out when a canonical key is asked for rather than on every move
+SYMMETRIC_LOCAL_KEYS = {player : tuple(_local_keys(SYMMETRIC_PIECE_KEYS[player][9*k:9*k + 9]) for k in range(9)) for player in ("X", "O")}
+
+
+## the key for one piece
+def piece_key(player, x, y, i, j):
+    return PIECE_KEYS[player][27*x + 9*y + 3*i + j]
+
+## the key for the side to move and forced grid, to be xored with the piece keys
+def turn_key(player, next_grid):
+    return SIDE_KEYS[player] ^ GRID_KEYS[next_grid]
+
+## the canonical key of a position, given the 9 bit piece masks of each player's local boards - the least of the keys of its 8 transforms, and the transform that gives it
+## every position in a class of symmetric positions has the same canonical key, and its transform takes it to the one position of the class with that key
+def canonical_key(xMasks, oMasks, player, next_grid):
+    xKeys, oKeys = SYMMETRIC_LOCAL_KEYS["X"], SYMMETRIC_LOCAL_KEYS["O"]
+    symmetricHash = 0
+    for k in range(9):
+        symmetricHash ^= xKeys[k][xMasks[k]] ^ oKeys[k][oMasks[k]]
+    keys = [(symmetricHash >> 64*t & MASK64) ^ grid for t, grid in enumerate(SYMMETRIC_GRID_KEYS[next_grid])]
+    key = min(keys)
+    return key ^ SIDE_KEYS[player], keys.index(key)
@@ -0,0 +1,271 @@
+/* Compiled random playout kernel for Ultimate Tic Tac Toe (see Playout.py for the pure Python version)
+ *
+ * A position is the snapshot tuple from Board.snapshot: X's 9 bit masks for each local board 3*x + y, O's masks,
+ * the next player ("X" or "O") and the index of the forced local board (or -1).
+ * The moves are chosen with the same splitmix64 generator and in the same order as Playout.python_random_playout,
+ * so both give the same result for the same seed.
+ * Build with: python setup.py build_ext --inplace
+ */
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <stdint.h>
+
+#define FULL 0x1FF
+
+static const int WIN_MASKS[8] = {0007, 0070, 0700, 0111, 0222, 0444, 0421, 0124};
+
+/* WINNING[mask] is 1 if the squares in mask contain a complete line, POPCOUNT[mask] is the number of squares in it,
+ * and OPEN_LINE[mask] is 1 if some line has no square in mask (so the other player can still complete it) */
+static char WINNING[FULL + 1];
+static int POPCOUNT[FULL + 1];
+static char OPEN_LINE[FULL + 1];
+
+static uint64_t next_random(uint64_t *state)
+{
+    uint64_t z = (*state += 0x9E3779B97F4A7C15ULL);
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9ULL;
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EBULL;
+    return z ^ (z >> 31);
+}
+
+/* the result of the game given the global masks: 'X', 'O', 'D', or 0 if it is still in play - the same rules as BitBoard.game_state
+ * the game is a draw once neither player's winnable local boards (won, or in play with a line free of the other's pieces) contain a line */
+static char game_result(int xWon, int oWon, int xWinnable, int oWinnable)
+{
+    if (WINNING[xWon])
+        return 'X';
+    if (WINNING[oWon])
+        return 'O';
+    if (!WINNING[xWinnable] && !WINNING[oWinnable])
+        return 'D';
+    return 0;
+}
+
+/* set the bit of local board k in the winnable masks from its pieces and state, as Playout.update_winnable */
+static void update_winnable(int k, int xPieces, int oPieces, int xWon, int oWon, int done, int *xWinnable, int *oWinnable)
+{
+    int bit = 1 << k;
+    *xWinnable &= ~bit;
+    *oWinnable &= ~bit;
+    if ((xWon & bit) || (!(done & bit) && OPEN_LINE[oPieces]))
+        *xWinnable |= bit;
+    if ((oWon & bit) || (!(done & bit) && OPEN_LINE[xPieces]))
+        *oWinnable |= bit;
+}
+
+/* play random moves from the position until the game ends
+ * if moves is not NULL, the index 9*k + c of each move played is written to it and their number to *length */
+static char playout(const int *xStart, const int *oStart, int xToMove, int grid, uint64_t *seed, unsigned char *moves, int *length)
+{
+    int xBits[9], oBits[9];
+    int xWon = 0, oWon = 0, done = 0, xWinnable = 0, oWinnable = 0;
+    int k, c, empty = 0, count, choice, pieces;
+    char state;
+
+    if (moves)
+        *length = 0;
+    for (k = 0; k < 9; k++) {
+        xBits[k] = xStart[k];
+        oBits[k] = oStart[k];
+        if (WINNING[xBits[k]])
+            xWon |= 1 << k;
+        else if (WINNING[oBits[k]])
+            oWon |= 1 << k;
+        if ((xBits[k] | oBits[k]) == FULL || ((xWon | oWon) >> k & 1))
+            done |= 1 << k;
+    }
+    for (k = 0; k < 9; k++)
+        update_winnable(k, xBits[k], oBits[k], xWon, oWon, done, &xWinnable, &oWinnable);
+    if (grid != -1 && (done >> grid & 1)) {
+        state = game_result(xWon, oWon, xWinnable, oWinnable);
+        return state ? state : 'D';
+    }
+
+    while (!(state = game_result(xWon, oWon, xWinnable, oWinnable))) {
+        /* count the legal moves, pick one, then find it in the same order as BitBoard.get_valid_moves */
+        if (grid == -1) {
+            count = 0;
+            for (k = 0; k < 9; k++)
+                if (!(done >> k & 1))
+                    count += POPCOUNT[FULL ^ (xBits[k] | oBits[k])];
+            choice = (int)(next_random(seed) % (uint64_t)count);
+            for (k = 0; k < 9; k++) {
+                if (done >> k & 1)
+                    continue;
+                empty = FULL ^ (xBits[k] | oBits[k]);
+                count = POPCOUNT[empty];
+                if (choice < count)
+                    break;
+                choice -= count;
+            }
+        } else {
+            k = grid;
+            empty = FULL ^ (xBits[k] | oBits[k]);
+            choice = (int)(next_random(seed) % (uint64_t)POPCOUNT[empty]);
+        }
+        for (c = 0; c < 9; c++) {
+            if (empty >> c & 1) {
+                if (choice == 0)
+                    break;
+                choice--;
+            }
+        }
+        if (moves)
+            moves[(*length)++] = (unsigned char)(9 * k + c);
+
+        if (xToMove) {
+            pieces = xBits[k] |= 1 << c;
+            if (WINNING[pieces]) {
+                xWon |= 1 << k;
+                done |= 1 << k;
+            }
+        } else {
+            pieces = oBits[k] |= 1 << c;
+            if (WINNING[pieces]) {
+                oWon |= 1 << k;
+                done |= 1 << k;
+            }
+        }
+        xToMove = !xToMove;
+        if ((xBits[k] | oBits[k]) == FULL)
+            done |= 1 << k;
+        update_winnable(k, xBits[k], oBits[k], xWon, oWon, done, &xWinnable, &oWinnable);
+
+        grid = (done >> c & 1) ? -1 : c;
+    }
+    return state;
+}
+
+/* read a snapshot tuple into the arrays, returning 0 with an exception set on failure */
+static int parse_snapshot(PyObject *snapshot, int *xBits, int *oBits, int *xToMove, int *grid)
+{
+    PyObject *xTuple, *oTuple;
+    const char *player;
+    int k;
+
+    if (!PyArg_ParseTuple(snapshot, "OOsi", &xTuple, &oTuple, &player, grid))
+        return 0;
+    if (!PyTuple_Check(xTuple) || !PyTuple_Check(oTuple) || PyTuple_GET_SIZE(xTuple) != 9 || PyTuple_GET_SIZE(oTuple) != 9) {
+        PyErr_SetString(PyExc_ValueError, "snapshot masks must be tuples of 9 ints");
+        return 0;
+    }
+    for (k = 0; k < 9; k++) {
+        xBits[k] = (int)PyLong_AsLong(PyTuple_GET_ITEM(xTuple, k)) & FULL;
+        oBits[k] = (int)PyLong_AsLong(PyTuple_GET_ITEM(oTuple, k)) & FULL;
+    }
+    if (PyErr_Occurred())
+        return 0;
+    *xToMove = player[0] == 'X';
+    return 1;
+}
+
+static PyObject *random_playout(PyObject *self, PyObject *args)
+{
+    PyObject *snapshot;
+    unsigned long long seed;
+    int xBits[9], oBits[9], xToMove, grid;
+    uint64_t state;
+    char result;
+
+    if (!PyArg_ParseTuple(args, "OK", &snapshot, &seed))
+        return NULL;
+    if (!parse_snapshot(snapshot, xBits, oBits, &xToMove, &grid))
+        return NULL;
+
+    state = seed;
+    Py_BEGIN_ALLOW_THREADS
+    result = playout(xBits, oBits, xToMove, grid, &state, NULL, NULL);
+    Py_END_ALLOW_THREADS
+
+    return PyUnicode_FromStringAndSize(&result, 1);
+}
+
+/* a playout as random_playout, also returning the moves played as bytes of move indexes 9*k + c */
+static PyObject *recorded_playout(PyObject *self, PyObject *args)
+{
+    PyObject *snapshot;
+    unsigned long long seed;
+    int xBits[9], oBits[9], xToMove, grid, length;
+    unsigned char moves[81];
+    uint64_t state;
+    char result;
+
+    if (!PyArg_ParseTuple(args, "OK", &snapshot, &seed))
+        return NULL;
+    if (!parse_snapshot(snapshot, xBits, oBits, &xToMove, &grid))
+        return NULL;
+
+    state = seed;
+    Py_BEGIN_ALLOW_THREADS
+    result = playout(xBits, oBits, xToMove, grid, &state, moves, &length);
+    Py_END_ALLOW_THREADS
+
+    return Py_BuildValue("s#y#", &result, (Py_ssize_t)1, (const char *)moves, (Py_ssize_t)length);
+}
+
+/* count playouts from the same position, each seeded by the next output of a generator seeded with seed */
+static PyObject *random_playouts(PyObject *self, PyObject *args)
+{
+    PyObject *snapshot;
+    unsigned long long seed;
+    Py_ssize_t count, n;
+    int xBits[9], oBits[9], xToMove, grid;
+    uint64_t seeds, state;
+    Py_ssize_t xWins = 0, oWins = 0, draws = 0;
+    char result;
+
+    if (!PyArg_ParseTuple(args, "OnK", &snapshot, &count, &seed))
+        return NULL;
+    if (!parse_snapshot(snapshot, xBits, oBits, &xToMove, &grid))
+        return NULL;
+
+    seeds = seed;
+    Py_BEGIN_ALLOW_THREADS
+    for (n = 0; n < count; n++) {
+        state = next_random(&seeds);
+        result = playout(xBits, oBits, xToMove, grid, &state, NULL, NULL);
+        if (result == 'X')
+            xWins++;
+        else if (result == 'O')
+            oWins++;
+        else
+            draws++;
+    }
+    Py_END_ALLOW_THREADS
+
+    return Py_BuildValue("nnn", xWins, oWins, draws);
+}
+
+static PyMethodDef PlayoutMethods[] = {
+    {"random_playout", random_playout, METH_VARARGS,
+     "random_playout(snapshot, seed) -> 'X', 'O' or 'D'\n\nPlay uniformly random moves from a Board.snapshot() until the game ends."},
+    {"recorded_playout", recorded_playout, METH_VARARGS,
+     "recorded_playout(snapshot, seed) -> (result, moves)\n\nA random_playout that also returns the moves played, as bytes of move indexes 9*k + c."},
+    {"random_playouts", random_playouts, METH_VARARGS,
+     "random_playouts(snapshot, count, seed) -> (xWins, oWins, draws)\n\nRun count random playouts from the same Board.snapshot()."},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef playoutmodule = {
+    PyModuleDef_HEAD_INIT, "_playout", "Compiled random playout kernel for Ultimate Tic Tac Toe.", -1, PlayoutMethods
+};
+
+PyMODINIT_FUNC PyInit__playout(void)
+{
+    int mask, line;
+    for (mask = 0; mask <= FULL; mask++) {
+        WINNING[mask] = 0;
+        POPCOUNT[mask] = 0;
+        OPEN_LINE[mask] = 0;
+        for (line = 0; line < 9; line++)
+            POPCOUNT[mask] += mask >> line & 1;
+        for (line = 0; line < 8; line++) {
+            if ((mask & WIN_MASKS[line]) == WIN_MASKS[line])
+                WINNING[mask] = 1;
+            if (!(mask & WIN_MASKS[line]))
+                OPEN_LINE[mask] = 1;
+        }
+    }
+    return PyModule_Create(&playoutmodule);
+}
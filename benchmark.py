@@ -0,0 +1,121 @@
+## Ultimate Tic Tac Toe project - benchmarks for the board engines and search
+
+import random
+import time
+import io
+import contextlib
+import numpy as np
+
+from Board import Board
+from BitBoard import BitBoard
+from BatchBoard import BatchBoard
+from LocalTables import WINNING
+from MCTS import MCTS
+from MCTS_RAVE import MCTS_RAVE
+from MCTS_Parallel import MCTS_TreeParallel
+
+
+## play random games from the empty board to the end and undo them again
+## returns the number of playouts per second of processor time
+def playout_throughput(boardClass, playouts=1000, seed=0):
+    random.seed(seed)
+    board = boardClass()
+    start = time.process_time()
+    for p in range(playouts):
+        counter = 0
+        while board.game_state() == board.stateDict["ongoing"]:
+            x,y,i,j = board.random_legal_move()
+            board.make_move(x,y,i,j)
+            counter += 1
+        for a in range(counter):
+            board.un_make_move()
+    return playouts / (time.process_time() - start)
+
+## the average length of random playouts from the empty board, when the game ends as soon as nobody can win (BitBoard.game_state)
+## and when it only ends on a win, on every global line holding boards won by both players, or when there are no moves left (the old rule)
+## both lengths are measured on the same games, which are played on to the end under the old rule
+def playout_lengths(games=2000, seed=0):
+    random.seed(seed)
+    board = BitBoard()
+    early = 0
+    full = 0
+    for g in range(games):
+        counter = 0
+        ended = None
+        while not (WINNING[board.xWon] or WINNING[board.oWon] or board.inevitable_draw() or not board.has_valid_moves()):
+            if ended == None and board.game_state() != board.stateDict["ongoing"]:
+                ended = counter
+            x,y,i,j = board.random_legal_move()
+            board.make_move(x,y,i,j)
+            counter += 1
+        early += counter if ended == None else ended
+        full += counter
+        for a in range(counter):
+            board.un_make_move()
+    return full / games, early / games
+
+## play random games in lockstep on a BatchBoard, exporting every position as self-play would for the net
+## returns the number of positions per second of processor time
+def batch_throughput(games=4096, seed=0):
+    rng = np.random.default_rng(seed)
+    boards = BatchBoard(games)
+    positions = 0
+    start = time.process_time()
+    while not boards.terminal().all():
+        positions += int(np.sum(~boards.terminal()))
+        boards.export()
+        scores = rng.random((games, 81))
+        scores[~boards.legal_mask()] = -1
+        boards.step(np.argmax(scores, axis=1))
+    return positions / (time.process_time() - start)
+
+## play games between two strategies with the same fixed time per move, each taking X in every other game
+## returns (wins, draws, losses) for the first strategy - the strategies' own printing is silenced
+def fixed_time_match(firstClass, secondClass, games=20, timeLimit=0.1, seed=0):
+    random.seed(seed)
+    results = [0, 0, 0]
+    for g in range(games):
+        board = Board()
+        strats = {}
+        first = board.xstr if g % 2 == 0 else board.ostr
+        with contextlib.redirect_stdout(io.StringIO()):
+            strats[first] = firstClass(board)
+            strats[board.ostr if first == board.xstr else board.xstr] = secondClass(board)
+            while board.game_state() == board.stateDict["ongoing"]:
+                player = board.next_player
+                strats[player].move(board, time.time() + timeLimit, player, board.get_last_move())
+        state = board.game_state()
+        if state == first:
+            results[0] += 1
+        elif state == board.stateDict["draw"]:
+            results[1] += 1
+        else:
+            results[2] += 1
+    return tuple(results)
+
+## search the empty board with MCTS_TreeParallel for the given number of seconds of wall time
+## returns the number of leaves simulated per second and the number of playouts per second
+def tree_parallel_rate(threads, playoutsPerLeaf=8, seconds=1.0):
+    board = Board()
+    ai = MCTS_TreeParallel(board, threads=threads, playoutsPerLeaf=playoutsPerLeaf)
+    with contextlib.redirect_stdout(io.StringIO()):
+        ai.move(board, time.time() + seconds)
+    if ai.executor != None:
+        ai.executor.shutdown()
+    return ai.count / seconds, ai.count * playoutsPerLeaf / seconds
+
+
+if __name__ == "__main__":
+    base = playout_throughput(Board)
+    print("Board: {:.0f} playouts/s".format(base))
+    fast = playout_throughput(BitBoard)
+    print("BitBoard: {:.0f} playouts/s ({:.1f}x)".format(fast, fast / base))
+    print("BatchBoard: {:.0f} positions/s".format(batch_throughput()))
+    full, early = playout_lengths()
+    print("Playout length: {:.1f} moves, {:.1f} stopping once nobody can win ({:.0%} shorter)".format(full, early, 1 - early / full))
+    wins, draws, losses = fixed_time_match(MCTS_RAVE, MCTS)
+    print("RAVE against UCT at 0.1s a move: {} wins, {} draws, {} losses".format(wins, draws, losses))
+    for threads in (1, 2, 4, 8):
+        for playoutsPerLeaf in (1, 8):
+            leaves, playouts = tree_parallel_rate(threads, playoutsPerLeaf)
+            print("Tree parallel, {} threads, {} playouts per leaf: {:.0f} leaves/s, {:.0f} playouts/s".format(threads, playoutsPerLeaf, leaves, playouts))
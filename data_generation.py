@@ -1,12 +1,9 @@
 ## Ultimate Tic Tac Toe project
 
-import tkinter as tk
+import time
 from MCTS import MCTS
-from GameManager import GameManager
-
-import pandas as pd
-
-import cProfile
+from Board import Board
+from GameRecord import GameRecordWriter, record_board
 
 import sys, os
 OUTPUT = sys.stdout
@@ -20,57 +17,32 @@ def enablePrint():
     sys.stdout = OUTPUT
 
 
-openingsPath = "openings.csv"
-cols = ["board", "end state"]
-
-try:
-    data = pd.read_csv(openingsPath)
-except FileNotFoundError:
-    print("yay")
-    data = pd.DataFrame(columns = cols)
-
-    data.to_csv(openingsPath)
-
-
-
-for i in range(500):
-    b = Board()
-    p1 = MCTS()
-    p2 = MCTS()
-
-    newData = pd.DataFrame(columns = cols)
-
-    p1Player = b.xstr
-    while b.game_state() != b.stateDict["ongoing"]:
-        start = time.time()
-        endTime = start + self.aiTime
-
-        lastMove = b.get_last_move()
-
-        if b.next_player == p1Player:
-            p1.move(b, endTime, b.next_player, lastMove)
-        else:
-            p2.move(b, endTime, b.next_player, lastMove)
-
-        p1ToPlay = not p1ToPlay
-    
-    data
-
-input()
-blockPrint()
-
-
+GAMES = 500
+AI_TIME = 0.5 # seconds per move
 
-enablePrint()
+## the games are appended to a GameRecord file
+openingsPath = "openings.uttt"
 
-print(manager.board.grid)
+with GameRecordWriter(openingsPath) as writer:
+    for game in range(GAMES):
+        b = Board()
+        p1 = MCTS(b)
+        p2 = MCTS(b)
 
-root = tk.Tk()
-man = GameManager(None, None, root = root, file = "recent.txt")
+        # the searches print every move, so only the progress is shown
+        blockPrint()
+        p1Player = b.xstr
+        while b.game_state() == b.stateDict["ongoing"]:
+            endTime = time.time() + AI_TIME
 
-##for i in range(10):
-##    manager.start_game(True)
-##    manager.reset()
+            lastMove = b.get_last_move()
 
+            if b.next_player == p1Player:
+                p1.move(b, endTime, b.next_player, lastMove)
+            else:
+                p2.move(b, endTime, b.next_player, lastMove)
+        enablePrint()
 
-# cython board is really worth it, 2x speed improvement
+        writer.append(record_board(b))
+        writer.flush()
+        print("Game {} / {}: {} in {} moves".format(game + 1, GAMES, b.game_state(), b.totalMoves))
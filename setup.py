@@ -1,5 +1,5 @@
-#cython setup file
-from distutils.core import setup
-from Cython.Build import cythonize
+#setup file for the compiled playout kernel (used by Playout.py when built)
+#build it in place with: python setup.py build_ext --inplace
+from setuptools import setup, Extension
 
-setup(ext_modules = cythonize("C:\\Users\\George\\AppData\\Local\\Programs\\Python\\Python36-32\\UTTT\\Smart version\\Board.pyx"))
+setup(name = "UTTT-ai", ext_modules = [Extension("_playout", ["_playout.c"])])
@@ -0,0 +1,61 @@
+## tests that BitBoard is a drop-in replacement for Board - the same random games played on both must agree at every ply,
+## on the way forward and again as the moves are undone
+
+import random
+
+from Board import Board
+from BitBoard import BitBoard
+
+
+## everything the searches read from a board, copied into a form that can be compared between the engines
+def position(board):
+    grid = board.grid
+    squares = tuple(grid[x][y][i][j] for x in range(3) for y in range(3) for i in range(3) for j in range(3))
+    localStates = tuple(board.local_game_state(x, y) for x in range(3) for y in range(3))
+    return (sorted(board.get_valid_moves()), board.game_state(), board.next_player, board.next_grid, board.totalMoves,
+            localStates, squares, board.snapshot())
+
+## play a seeded random game on a Board and a BitBoard together, returning the position of each after every ply (the start included)
+def play_game(board, bitBoard, seed):
+    rng = random.Random(seed)
+    positions = [(position(board), position(bitBoard))]
+    while board.game_state() == board.stateDict["ongoing"]:
+        x,y,i,j = rng.choice(sorted(board.get_valid_moves()))
+        board.make_move(x,y,i,j)
+        bitBoard.make_move(x,y,i,j)
+        positions.append((position(board), position(bitBoard)))
+    return positions
+
+
+def test_engines_agree_on_random_games():
+    for seed in range(200):
+        for boardPosition, bitBoardPosition in play_game(Board(), BitBoard(), seed):
+            assert boardPosition == bitBoardPosition
+
+def test_engines_end_games_the_same_way():
+    states = set()
+    for seed in range(200):
+        board, bitBoard = Board(), BitBoard()
+        play_game(board, bitBoard, seed)
+        assert bitBoard.game_state() == board.game_state()
+        states.add(board.game_state())
+    ## the games cover wins for both players and draws
+    assert states == {"X", "O", "D"}
+
+def test_unmake_restores_every_position():
+    for seed in range(100):
+        board, bitBoard = Board(), BitBoard()
+        positions = play_game(board, bitBoard, seed)
+        for boardPosition, bitBoardPosition in reversed(positions[:-1]):
+            board.un_make_move()
+            bitBoard.un_make_move()
+            assert position(board) == boardPosition
+            assert position(bitBoard) == bitBoardPosition
+
+def test_loaded_board_matches_played_board():
+    for seed in range(20):
+        board, bitBoard = Board(), BitBoard()
+        positions = play_game(board, bitBoard, seed)
+        loaded = BitBoard()
+        loaded.load_snapshot(board.snapshot())
+        assert position(loaded)[:4] == positions[-1][1][:4]
@@ -0,0 +1,87 @@
+## tests that recorded games survive the round trip through a games file - the moves, result, start position and visit distributions
+## read back must be the ones written, with and without the optional parts of the record
+
+import random
+import numpy as np
+
+from Board import Board
+from GameRecord import GameRecord, GameRecordWriter, GameRecordReader, record_board, move_index
+
+
+## a seeded random game played from the board's position for up to plies moves (or to the end), recorded with made-up visit distributions if visits
+def random_record(seed, board=None, plies=None, visits=False):
+    rng = random.Random(seed)
+    if board == None:
+        board = Board()
+    start = None if board.totalMoves == 0 else board.snapshot()
+    board = board.search_copy()
+    distributions = []
+    while board.game_state() == board.stateDict["ongoing"] and len(distributions) != plies:
+        moves = board.get_valid_moves()
+        distribution = np.zeros(81)
+        distribution[[move_index(move) for move in moves]] = np.random.default_rng(seed).random(len(moves))
+        distributions.append(distribution / distribution.sum())
+        board.make_move(*rng.choice(moves))
+    return record_board(board, start, distributions if visits else None)
+
+## a spread of records - finished and unfinished games, from the empty board and from a position part way through a game, with and without visits
+def sample_records():
+    midgame = Board()
+    for move in random_record(100, plies=12).move_list():
+        midgame.make_move(*move)
+    return [random_record(0), random_record(1, visits=True), random_record(2, plies=5), random_record(3, midgame),
+            random_record(4, midgame, visits=True), GameRecord()]
+
+def assert_same_record(read, written):
+    assert read.moves == written.moves
+    assert read.result == written.result
+    assert read.start == written.start
+    assert len(read) == len(written)
+    if written.visits is None:
+        assert read.visits is None
+    else:
+        assert np.array_equal(read.visits, written.visits)
+
+
+def test_records_round_trip_through_a_file(tmp_path):
+    path = str(tmp_path / "games.bin")
+    records = sample_records()
+    with GameRecordWriter(path) as writer:
+        numbers = [writer.append(record) for record in records]
+    assert numbers == list(range(len(records)))
+
+    reader = GameRecordReader(path)
+    assert len(reader) == len(records)
+    for read, written in zip(reader, records):
+        assert_same_record(read, written)
+    ## random access gives the same records
+    assert_same_record(reader[3], records[3])
+    assert_same_record(reader[1], records[1])
+
+def test_record_header_fields():
+    records = sample_records()
+    assert records[0].result in ("X", "O", "D")
+    assert records[2].result == "E" and len(records[2]) == 5
+    assert records[3].start != records[0].start
+    assert records[1].visits.shape == (len(records[1]), 81)
+
+def test_appending_to_an_existing_file(tmp_path):
+    path = str(tmp_path / "games.bin")
+    records = sample_records()
+    with GameRecordWriter(path) as writer:
+        for record in records[:2]:
+            writer.append(record)
+    with GameRecordWriter(path) as writer:
+        assert [writer.append(record) for record in records[2:]] == list(range(2, len(records)))
+
+    reader = GameRecordReader(path)
+    assert len(reader) == len(records)
+    for read, written in zip(reader, records):
+        assert_same_record(read, written)
+
+def test_read_record_replays_to_the_same_position():
+    for record in sample_records():
+        board = Board()
+        board.load_record(record)
+        assert board.game_state() == record.result
+        assert len(board.moves) == len(record)
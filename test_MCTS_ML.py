@@ -0,0 +1,68 @@
+## tests for turning the net's output into a node's prior and score (MCTS_ML.node_evaluation)
+## the net's policy head gives a (1,81) array for a single position, and the prior must come out as a flat (81,) array over the legal moves
+
+import random
+import numpy as np
+
+from Board import Board
+from MCTS_ML import MCTS_ML
+
+
+## a board part way through a game, so that only some moves are legal
+def midgame_board(seed=0):
+    random.seed(seed)
+    board = Board()
+    for a in range(15):
+        board.make_move(*random.choice(board.get_valid_moves()))
+    return board
+
+def legal_indexes(moves):
+    return [27*x + 9*y + 3*i + j for x,y,i,j in moves]
+
+def check_prior(prior, moves):
+    legal = legal_indexes(moves)
+    illegal = np.ones(81, dtype=bool)
+    illegal[legal] = False
+    assert prior.shape == (81,)
+    assert np.all(prior[illegal] == 0)
+    assert np.all(prior[legal] >= 0)
+    assert np.isclose(prior[legal].sum(), 1)
+
+def test_prior_from_net_output_shape():
+    board = midgame_board()
+    ai = MCTS_ML(board, None)
+    moves = board.get_valid_moves()
+    policy = np.random.default_rng(0).random((1, 81))
+    policy /= policy.sum()
+
+    prior, score = ai.node_evaluation(moves, policy, 0.2)
+
+    check_prior(prior, moves)
+    assert np.isclose(score, 0.4)
+
+    ## the prior keeps the net's preferences between the legal moves
+    legal = legal_indexes(moves)
+    assert np.allclose(prior[legal], policy[0, legal] / policy[0, legal].sum())
+
+def test_prior_when_net_prefers_illegal_moves():
+    board = midgame_board(1)
+    ai = MCTS_ML(board, None)
+    moves = board.get_valid_moves()
+    legal = legal_indexes(moves)
+    policy = np.full((1, 81), 1.0 / (81 - len(legal)))
+    policy[0, legal] = 0
+
+    prior, score = ai.node_evaluation(moves, policy, -1)
+
+    check_prior(prior, moves)
+    ## with no mass on the legal moves the prior is uniform over them
+    assert np.allclose(prior[legal], 1.0 / len(legal))
+    assert np.isclose(score, 1)
+
+def test_prior_on_empty_board():
+    board = Board()
+    ai = MCTS_ML(board, None)
+    moves = board.get_valid_moves()
+    prior, score = ai.node_evaluation(moves, np.full((1, 81), 1.0 / 81), 0)
+    check_prior(prior, moves)
+    assert np.allclose(prior, 1.0 / 81)
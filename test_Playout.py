@@ -0,0 +1,76 @@
+## tests that the playout kernels agree - the compiled kernel in _playout.c and the pure Python fallback must give the same result for the same seed
+## the native tests are skipped when _playout hasn't been built (python setup.py build_ext --inplace)
+
+import random
+import pytest
+
+from Board import Board
+import Playout
+
+native = pytest.mark.skipif(Playout.native_random_playout == None, reason="_playout is not built")
+
+
+## snapshots of positions from a spread of random games, from the empty board to late in the game (some of them finished)
+def random_snapshots(count=60, seed=0):
+    random.seed(seed)
+    snapshots = []
+    for n in range(count):
+        board = Board()
+        for a in range(random.randrange(70)):
+            if board.game_state() != board.stateDict["ongoing"]:
+                break
+            board.make_move(*random.choice(board.get_valid_moves()))
+        snapshots.append(board.snapshot())
+    return snapshots
+
+## positions whose forced local board is already finished - won by X, won by O, and full without a winner - so there are no legal moves
+def forced_done_snapshots():
+    empty = (0,) * 9
+    xWonCentre = tuple(0b000111000 if k == 4 else 0 for k in range(9))
+    oWonCorner = tuple(0b100010001 if k == 0 else 0 for k in range(9))
+    xFull = tuple(0b110001101 if k == 8 else 0 for k in range(9))
+    oFull = tuple(0b001110010 if k == 8 else 0 for k in range(9))
+    return [(xWonCentre, empty, "O", 4), (empty, oWonCorner, "X", 0), (xFull, oFull, "X", 8)]
+
+def all_snapshots():
+    return random_snapshots() + forced_done_snapshots()
+
+def seeds(count=5, seed=1):
+    rng = random.Random(seed)
+    return [rng.getrandbits(64) for n in range(count)]
+
+
+def test_forced_done_board_ends_the_game():
+    for snapshot in forced_done_snapshots():
+        assert Playout.python_random_playout(snapshot, 0) in ("X", "O", "D")
+        moves = []
+        Playout.python_random_playout(snapshot, 0, moves)
+        assert moves == []
+
+def test_numpy_playouts_match_single_playouts():
+    for snapshot in all_snapshots():
+        for seed in seeds(2):
+            rng = Playout.SplitMix64(seed)
+            results = [Playout.python_random_playout(snapshot, rng.next()) for n in range(20)]
+            expected = (results.count("X"), results.count("O"), results.count("D"))
+            assert Playout.numpy_random_playouts(snapshot, 20, seed) == expected
+
+@native
+def test_native_playout_matches_python():
+    for snapshot in all_snapshots():
+        for seed in seeds():
+            assert Playout.native_random_playout(snapshot, seed) == Playout.python_random_playout(snapshot, seed)
+
+@native
+def test_native_recorded_playout_matches_python():
+    for snapshot in all_snapshots():
+        for seed in seeds():
+            moves = []
+            state = Playout.python_random_playout(snapshot, seed, moves)
+            assert Playout.native_recorded_playout(snapshot, seed) == (state, bytes(moves))
+
+@native
+def test_native_playouts_match_numpy():
+    for snapshot in all_snapshots():
+        for seed in seeds(2):
+            assert Playout.native_random_playouts(snapshot, 50, seed) == Playout.numpy_random_playouts(snapshot, 50, seed)
@@ -0,0 +1,86 @@
+## tests for the replay buffer's ring of samples - wrapping round once it is full, reopening from disk, and sampling only the slots that hold samples
+## each sample's state, policy and result are filled with its number, so the samples read back can be identified
+
+import numpy as np
+import pytest
+
+from ReplayBuffer import ReplayBuffer
+
+
+## the samples numbered first to first + count - 1
+def numbered_samples(first, count):
+    numbers = np.arange(first, first + count, dtype=np.float32)
+    return np.repeat(numbers, 81).reshape(count, 9, 9), np.repeat(numbers, 81).reshape(count, 81), numbers
+
+## the numbers of the samples held, oldest first
+def held_numbers(replay):
+    slots = (replay.position - len(replay) + np.arange(len(replay))) % replay.capacity
+    return list(replay.results[slots])
+
+
+def test_filling_up_to_capacity(tmp_path):
+    replay = ReplayBuffer(str(tmp_path), capacity=10)
+    replay.add(*numbered_samples(0, 4))
+    assert (replay.position, len(replay)) == (4, 4)
+    replay.add(*numbered_samples(4, 6))
+    assert (replay.position, len(replay)) == (0, 10)
+    assert held_numbers(replay) == list(range(10))
+
+def test_wrap_around_overwrites_the_oldest(tmp_path):
+    replay = ReplayBuffer(str(tmp_path), capacity=10)
+    replay.add(*numbered_samples(0, 7))
+    replay.add(*numbered_samples(7, 7))
+    assert (replay.position, len(replay)) == (4, 10)
+    assert held_numbers(replay) == list(range(4, 14))
+    ## the newest samples went into the first slots
+    assert list(replay.results[:4]) == [10, 11, 12, 13]
+    assert np.all(replay.states[2] == 12) and np.all(replay.policies[2] == 12)
+
+def test_adding_more_than_capacity_keeps_the_newest(tmp_path):
+    replay = ReplayBuffer(str(tmp_path), capacity=10)
+    replay.add(*numbered_samples(0, 3))
+    replay.add(*numbered_samples(3, 25))
+    assert (replay.position, len(replay)) == (3, 10)
+    assert held_numbers(replay) == list(range(18, 28))
+
+def test_reopening_an_existing_buffer(tmp_path):
+    replay = ReplayBuffer(str(tmp_path), capacity=10)
+    replay.add(*numbered_samples(0, 8))
+    replay.add(*numbered_samples(8, 5))
+    replay.flush()
+    del replay
+
+    ## the capacity it was made with is kept, whatever is asked for
+    reopened = ReplayBuffer(str(tmp_path), capacity=50)
+    assert (reopened.capacity, reopened.position, len(reopened)) == (10, 3, 10)
+    assert held_numbers(reopened) == list(range(3, 13))
+
+    ## and adding carries on where it left off
+    reopened.add(*numbered_samples(13, 2))
+    assert (reopened.position, len(reopened)) == (5, 10)
+    assert held_numbers(reopened) == list(range(5, 15))
+
+def test_sample_only_returns_filled_slots(tmp_path):
+    replay = ReplayBuffer(str(tmp_path), capacity=100)
+    replay.add(*numbered_samples(1, 5))
+    rng = np.random.default_rng(0)
+    for halfLife in (None, 2):
+        states, policies, results = replay.sample(1000, halfLife, rng)
+        assert set(results) == {1, 2, 3, 4, 5}
+        assert np.all(states == results[:, None, None]) and np.all(policies == results[:, None])
+
+def test_sample_after_wrap_around(tmp_path):
+    replay = ReplayBuffer(str(tmp_path), capacity=10)
+    replay.add(*numbered_samples(0, 14))
+    rng = np.random.default_rng(0)
+    states, policies, results = replay.sample(2000, rng=rng)
+    assert set(results) == set(range(4, 14))
+    ## with a half life the newest samples are drawn most often
+    states, policies, results = replay.sample(2000, halfLife=2, rng=rng)
+    assert set(results) <= set(range(4, 14))
+    assert np.sum(results == 13) > np.sum(results == 4)
+
+def test_sample_from_empty_buffer(tmp_path):
+    replay = ReplayBuffer(str(tmp_path), capacity=10)
+    with pytest.raises(ValueError):
+        replay.sample(1)
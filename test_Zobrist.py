@@ -0,0 +1,104 @@
+## tests for the Zobrist keys kept by Board and BitBoard - the key kept up to date by make_move and un_make_move must always be
+## the key worked out from scratch from the position, and the canonical key must be the same for all 8 symmetric copies of a position
+
+import random
+import numpy as np
+
+from Board import Board
+from BitBoard import BitBoard
+import Symmetry
+import Zobrist
+
+
+## the key of the board's position worked out from its squares
+def recomputed_key(board):
+    key = Zobrist.turn_key(board.next_player, board.next_grid)
+    grid = board.grid
+    for x in range(3):
+        for y in range(3):
+            for i in range(3):
+                for j in range(3):
+                    if grid[x][y][i][j] != board.estr:
+                        key ^= Zobrist.piece_key(grid[x][y][i][j], x, y, i, j)
+    return key
+
+## the moves of a seeded random game, played to the end
+def random_game(seed):
+    rng = random.Random(seed)
+    board = BitBoard()
+    moves = []
+    while board.game_state() == board.stateDict["ongoing"]:
+        move = rng.choice(sorted(board.get_valid_moves()))
+        board.make_move(*move)
+        moves.append(move)
+    return moves
+
+
+def test_key_matches_recompute_after_make_and_unmake():
+    for boardClass in (Board, BitBoard):
+        for seed in range(30):
+            board = boardClass()
+            keys = [board.zobrist_key]
+            for move in random_game(seed):
+                board.make_move(*move)
+                assert board.zobrist_key == recomputed_key(board)
+                keys.append(board.zobrist_key)
+            for key in reversed(keys[:-1]):
+                board.un_make_move()
+                assert board.zobrist_key == recomputed_key(board) == key
+
+def test_engines_give_the_same_key():
+    for seed in range(30):
+        board, bitBoard = Board(), BitBoard()
+        for move in random_game(seed):
+            board.make_move(*move)
+            bitBoard.make_move(*move)
+            assert board.zobrist_key == bitBoard.zobrist_key
+
+def test_key_depends_on_side_and_grid():
+    board = BitBoard()
+    board.make_move(1, 1, 0, 2) # O to play in local board 2
+    keys = {board.zobrist_key}
+    ## the same pieces with the other player to move, or a different forced grid
+    for player, grid in (("X", 2), ("O", 4), ("O", -1), ("X", -1)):
+        other = BitBoard()
+        other.load_snapshot((tuple(board.xBits), tuple(board.oBits), player, grid))
+        keys.add(other.zobrist_key)
+    assert len(keys) == 5
+
+## the board after the first plies moves of a game, with every move moved by transform t - the game is symmetric, so the moves stay legal
+def transformed_board(boardClass, moves, plies, t):
+    board = boardClass()
+    for move in moves[:plies]:
+        board.make_move(*Symmetry.transform_move(move, t))
+    return board
+
+def test_canonical_key_is_the_same_for_every_transform():
+    for boardClass in (Board, BitBoard):
+        for seed in range(10):
+            moves = random_game(seed)
+            for plies in range(0, len(moves) + 1, 3):
+                boards = [transformed_board(boardClass, moves, plies, t) for t in range(Symmetry.COUNT)]
+                canonicals = [board.canonical() for board in boards]
+                assert len(set(key for key, transform in canonicals)) == 1
+                ## and each copy's transform takes it to the same canonical position
+                states = [Symmetry.transform_state(board.export(), transform) for board, (key, transform) in zip(boards, canonicals)]
+                for state in states[1:]:
+                    assert np.array_equal(state, states[0])
+
+def test_engines_give_the_same_canonical_key():
+    for seed in range(10):
+        board, bitBoard = Board(), BitBoard()
+        for move in random_game(seed):
+            board.make_move(*move)
+            bitBoard.make_move(*move)
+            assert board.canonical() == bitBoard.canonical()
+
+def test_canonical_key_tells_apart_positions_that_are_not_symmetric():
+    ## the positions after one move from the empty board fall into 15 classes (see MCTS_TT.expansion)
+    keys = set()
+    for move in BitBoard().get_valid_moves():
+        board = BitBoard()
+        board.make_move(*move)
+        keys.add(board.canonical()[0])
+    assert len(keys) == 15